@@ -105,67 +105,160 @@ import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s') # logging.INFO, logging.DEBUG
 LOG = logging.getLogger(__name__)
 
-import types, typing, inspect, importlib.util as imp_util                  
+import types, typing, weakref, threading, importlib.util as imp_util                  
 from os.path import abspath as absopath, normpath, join as joinpath, dirname as superdir, exists as hasfile
+CALLER_DEPTH = 16 # frames walked past importpy's own frames
+CALLER_BANK = {}  # id(caller code) → (weakref of code, caller path, caller package)
+def caller() -> typing.Tuple[str, str] : # (path, package) of the first frame outside this file, O(1) in stack depth
+    frame = sys._getframe(1)
+    for _ in range(CALLER_DEPTH):
+        if frame is None or frame.f_code.co_filename != __file__: break
+        frame = frame.f_back
+    if frame is None or frame.f_code.co_filename == __file__: raise RuntimeError(f"[ERR] cannot found caller frame within [{CALLER_DEPTH}] ...")
+    code = frame.f_code
+    hit = CALLER_BANK.get(id(code))
+    if hit and hit[0]() is code: return hit[1], hit[2]
+    cpth = code.co_filename.replace('\\', '/')         # caller path
+    cpkg = frame.f_globals.get("__package__") or '' # caller package name
+    CALLER_BANK[id(code)] = (weakref.ref(code, lambda _, k=id(code): CALLER_BANK.pop(k, None)), cpth, cpkg)
+    return cpth, cpkg
+
+class LazyModule(types.ModuleType): # first attribute access loads once under a lock, python < 3.12.3 lets other threads see a half executed module
+    def __getattribute__(self, attr):
+        get = types.ModuleType.__getattribute__
+        state = get(self, '__spec__').loader_state
+        with state['lock']:
+            if get(self, '__class__') is LazyModule:
+                if state['busy']: return get(self, attr) # re-entered while executing
+                state['busy'] = True
+                try:
+                    then, now = state['__dict__'], get(self, '__dict__')
+                    mutated = {k: v for k, v in now.items() if k not in then or then[k] is not v}
+                    name = get(self, '__spec__').name
+                    get(self, '__spec__').loader.exec_module(self)
+                    if name in sys.modules and sys.modules[name] is not self: raise ValueError(f"module object for {name!r} substituted in sys.modules during a lazy load")
+                    now.update(mutated)
+                    self.__class__ = state['__class__'] # module subclass from module_from_spec kept
+                finally: state['busy'] = False
+        return getattr(self, attr)
+    def __delattr__(self, attr):
+        self.__getattribute__(attr)
+        delattr(self, attr)
+
+class LazyLoader(imp_util.LazyLoader):
+    def exec_module(self, module):
+        spec = module.__spec__
+        super().exec_module(module)
+        spec.loader_state.update(lock=threading.RLock(), busy=False)
+        module.__class__ = LazyModule
+
 def loader(file: str, *args, custom_finder=None, uselazy: bool = True, isolate: bool=True) -> typing.Union[types.ModuleType, typing.Any] : 
     return _imports(file, *args, custom_finder=custom_finder, uselazy=uselazy, isolate=isolate)
 
+def import_many(files: typing.Iterable[str], *args, uselazy: bool = True, isolate: bool=True) -> typing.List[typing.Any] : # remote urls fetched concurrently and registered at once, results in order
+    files = [f if not isinstance(f, pathlib.Path) else f.as_posix() for f in files]
+    bound = {f: module_bank[(f, args)] for f in files if '://' in f and not isolate and (f, args) in module_bank}
+    remote = [f for f in dict.fromkeys(files) if '://' in f and f not in bound]
+    if remote:
+        from importpy.protocol import RemoteMetaImporter
+        impo = RemoteMetaImporter.getInstance()
+        for f, modl in zip(remote, impo.imports_many(remote, uselazy=uselazy, isolate=isolate)):
+            bound[f] = module_bank[(f, args)] = modl if not args else attrib(modl, args)
+    return [bound[f] if '://' in f else _imports(f, *args, uselazy=uselazy, isolate=isolate) for f in files]
+
+async def aimport(file: str, *args, custom_finder=None, uselazy: bool = True, isolate: bool=True) -> typing.Union[types.ModuleType, typing.Any] : # fetch/crawl/prefetch on an executor, exec on the loop thread
+    file = file if not isinstance(file, pathlib.Path) else file.as_posix()
+    if not '://' in file: return _imports(file, *args, custom_finder=custom_finder, uselazy=uselazy, isolate=isolate) # local, nothing to wait for
+    bank_key = (file, args)
+    if isolate: module_bank.pop(bank_key, None)
+    elif bank_key in module_bank: return module_bank[bank_key]
+
+    from importpy.protocol import RemoteMetaImporter
+    impo = RemoteMetaImporter.getInstance()
+    modl = await impo.aimports(file, custom_finder=custom_finder, uselazy=uselazy, isolate=isolate)
+
+    bind = module_bank[bank_key] = modl if not args else attrib(modl, args)
+    return bind
+
+async def aimport_many(files: typing.Iterable[str], *args, uselazy: bool = True, isolate: bool=True) -> typing.List[typing.Any] : # remote gathered, results in order, no shared custom_finder
+    import asyncio
+    files = [f if not isinstance(f, pathlib.Path) else f.as_posix() for f in files]
+    local = {i: _imports(f, *args, uselazy=uselazy, isolate=isolate) for i, f in enumerate(files) if not '://' in f} # resolved against the caller frame, a gathered task only sees asyncio frames
+    got = iter(await asyncio.gather(*(aimport(f, *args, uselazy=uselazy, isolate=isolate) for f in files if '://' in f)))
+    return [local[i] if i in local else next(got) for i in range(len(files))]
+
+def verify(modl: types.ModuleType, args) -> bool : # check all string instance
+    if any(not isinstance(n, str) for n in args): raise AttributeError(f"[ERR] args must be str type {args} in [{modl.__name__}] ...")
+    return all(hasattr(modl, n) or n == '*' for n in args)
+def attrib(modl: types.ModuleType, args) -> typing.Tuple :
+    if not verify(modl, args): raise AttributeError(f"[ERR] cannot find attribute {args} in [{modl.__name__}] ...")
+    _a = tuple(getattr(modl, n) if has else modl for n in args if (has := hasattr(modl, n)) or n == '*') # walrus op with above p3.8
+    return _a if 1 < len(_a) else _a[0]
+
 module_bank = {} 
+resolve_bank = {} # (caller path, caller package, requested file) → (path, pack, initpack, hasinit, mtime_ns)
+load_locks = weakref.WeakValueDictionary() # module name → RLock while a load holds it, reentrant for cyclic imports, remote imports lock per url
+load_guard = threading.Lock()
+def load_lock(pack: str) -> threading.RLock :
+    with load_guard: return load_locks.setdefault(pack, threading.RLock())
 def _imports(file: str, *args, custom_finder=None, uselazy: bool = True, isolate: bool=True) -> typing.Union[types.ModuleType, typing.Tuple[typing.Any, ...]] : # @14mhz, lazy-style custrom importer
-    def stacks(frame) -> list : # with stacks(inspect.currentframe())
-        return [] if not frame else [frame] + stacks(frame.f_back)
     def module(pack: str, path: str, iseager: bool = False) -> types.ModuleType :
         spec = imp_util.spec_from_file_location(pack, path, submodule_search_locations = None if not iseager else [superdir(path)] )
         if spec.loader is None: raise ImportError(f"[ERR] cannot find loader [{path}]")
         modl = imp_util.module_from_spec(spec)
-        load = spec.loader if iseager or not uselazy else imp_util.LazyLoader(spec.loader) 
+        load = spec.loader if iseager or not uselazy else LazyLoader(spec.loader) 
         try: load.exec_module(modl) 
         except Exception as e: raise ImportError(f"[ERR] execution error loader [{path}] {e}")
         return modl
-    def verify(modl: types.ModuleType, args) -> bool : # check all string instance
-        if any(not isinstance(n, str) for n in args): raise AttributeError(f"[ERR] args must be str type {args} in [{modl.__name__}] ...")
-        return all(hasattr(modl, n) or n == '*' for n in args)
-    def attrib(modl: types.ModuleType, args) -> typing.Tuple :
-        if not verify(modl, args): raise AttributeError(f"[ERR] cannot find attribute {args} in [{modl.__name__}] ...")
-        _a = tuple(getattr(modl, n) if has else modl for n in args if (has := hasattr(modl, n)) or n == '*') # walrus op with above p3.8
-        return _a if 1 < len(_a) else _a[0]
-
     file = file if not isinstance(file, pathlib.Path) else file.as_posix()
     if not '://' in file: 
         if not file.endswith('.py'): raise ValueError(f"[ERR] import path must end with .py [maybe {file}.py?] ...")
-        stck = [s for s in stacks(inspect.currentframe())] # .py caller ie, c+0 is me, c+1 is loader, c+2 is caller !, use inspect.stack()???
-        stid = next((i+2 for i, p in enumerate(stck) if __file__ == p.f_code.co_filename), None) 
-        cpth = stck[stid].f_code.co_filename.replace('\\', '/') # caller path
-        cpkg = stck[stid].f_globals.get("__package__") or ''    # caller package name
-        if not cpth: raise RuntimeError(f"[ERR] cannot found call stack [{stck}] ...")
-        LOG.debug(f"traced stid[{stid}] → cpkg[{cpkg}] → cpth[{cpth}]")
+        cpth, cpkg = caller() # .py caller, first frame outside of loader/_imports
+        if not cpth: raise RuntimeError(f"[ERR] cannot found caller path ...")
+
+        hit = resolve_bank.get((cpth, cpkg, file)) # fast path, resolved before and file unchanged since
+        if hit:
+            path, pack, initpack, hasinit, mtime = hit
+            try: same = os.stat(path).st_mtime_ns == mtime
+            except OSError: same = False
+            if same and pack in sys.modules and (not hasinit or initpack in sys.modules):
+                bank_key = (path, args)
+                bind = module_bank.get(bank_key)
+                if isolate or bind is None: bind = module_bank[bank_key] = sys.modules[pack] if not args else attrib(sys.modules[pack], args)
+                return bind
+        LOG.debug(f"traced cpkg[{cpkg}] → cpth[{cpth}]")
         
         path = absopath(joinpath(superdir(cpth), file)).replace('\\', '/') # .py to absolute path
         ppth = normpath(joinpath(cpkg.replace('.', '/'), file))            # ex) 'wdep/pack\\../util/web.py' to 'wdep\\util\\web.py'
         pack = ppth.replace('\\', '/').replace('../', '').replace('/', '.').replace('.py', '') # ex) wdep.pack.web
-        if not hasfile(path): raise FileNotFoundError(f"[ERR] cannot find .py path [{path}] ...")
+        try: mtime = os.stat(path).st_mtime_ns
+        except OSError: raise FileNotFoundError(f"[ERR] cannot find .py path [{path}] ...")
         LOG.debug(f"caller [{cpth.rpartition('/')[2]}] imports [{file}] → module [{pack}]{args}")
 
         bank_key = (path, args)
         if isolate: module_bank.pop(bank_key, None)
         initpack = pack.rpartition('.')[0] # a.b.c → a.b, load package '__init__.py'
-        initpath = '' if initpack in sys.modules else joinpath(os.path.dirname(path), '__init__.py').replace('\\', '/')
-        if initpack and hasfile(initpath): LOG.debug(f"load package init → [{initpath}]"); sys.modules[initpack] = module(initpack, initpath, True) 
+        if initpack:
+            with load_lock(initpack):
+                initpath = '' if initpack in sys.modules else joinpath(os.path.dirname(path), '__init__.py').replace('\\', '/')
+                if hasfile(initpath): LOG.debug(f"load package init → [{initpath}]"); sys.modules[initpack] = module(initpack, initpath, True) 
+        resolve_bank[(cpth, cpkg, file)] = (path, pack, initpack, bool(initpack) and hasfile(joinpath(os.path.dirname(path), '__init__.py')), mtime)
 
-        if bank_key in module_bank: return module_bank[bank_key]
-        if not pack in sys.modules: sys.modules[pack] = module(pack, path)
-        module_bank[bank_key] = sys.modules[pack] if not args else attrib(sys.modules[pack], args)
-        return module_bank[bank_key]        
+        with load_lock(pack):
+            if bank_key in module_bank: return module_bank[bank_key]
+            if not pack in sys.modules: sys.modules[pack] = module(pack, path)
+            module_bank[bank_key] = sys.modules[pack] if not args else attrib(sys.modules[pack], args)
+            return module_bank[bank_key]        
     else:
         bank_key = (file, args)
         if isolate: module_bank.pop(bank_key, None)
-        if bank_key in module_bank: return module_bank[bank_key]
+        elif bank_key in module_bank: return module_bank[bank_key]
 
         from importpy.protocol import RemoteMetaImporter
         impo = RemoteMetaImporter.getInstance()
-        modl = impo.imports(file, uselazy=uselazy, isolate=isolate)
+        modl = impo.imports(file, custom_finder=custom_finder, uselazy=uselazy, isolate=isolate)
 
-        module_bank[bank_key] = modl if not args else attrib(modl, args)
-        return module_bank[bank_key]
+        bind = module_bank[bank_key] = modl if not args else attrib(modl, args)
+        return bind
     pass
 pass
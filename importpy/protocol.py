@@ -1,4 +1,5 @@
-import os, io, sys, abc
+import os, io, sys, abc, asyncio, threading, contextlib
+from concurrent.futures import Future, ThreadPoolExecutor
 import importlib.abc, importlib.util
 
 import logging
@@ -7,6 +8,8 @@ LOG = logging.getLogger(__name__)
 try: from . import __init__ as init # register as sys.modules['importpy'], run with package 
 except: import __init__ as init     # register as sys.modules['__init__'], run with direct
 init = init.__self__ if type(init).__name__ == 'method-wrapper' else init # else init is 'module'
+trace = init.loader('./protocol_trace.py')
+cache = init.loader('./protocol_cache.py')
 impl = init.loader('./protocol_impl.py')
 
 #####################################
@@ -14,7 +17,13 @@ impl = init.loader('./protocol_impl.py')
 class CustomResource:
     def __init__(self, name, bytes_data):
         self.name = name
-        self.bytes = bytes_data
+        self.data = bytes_data # bytes or callable, materialised on first access
+    @property
+    def bytes(self):
+        if callable(self.data):
+            try: self.data = bytes(self.data())
+            except: self.data = b''
+        return self.data
     def read_text(self, encoding='utf-8'):
         return self.bytes.decode(encoding)
 
@@ -29,9 +38,7 @@ class CustomResourceFinder:
         if archive:
             for name in archive.namelist():
                 if name.endswith(('.exe', '.txt', '.cfg', '.json')) or ".data/" in name:
-                    try:
-                        resources.append(CustomResource(name, archive.read(name)))
-                    except: pass
+                    resources.append(CustomResource(name, lambda name=name: archive.read(name))) # lazy, read on access
         return resources
     def iterator(self, prefix=""): return iter(self.resources)
 
@@ -53,7 +60,8 @@ class AbstractMetaFinder(importlib.abc.MetaPathFinder):
             if p in self.tree:
                 ispk = '__init__' in p
                 load = self.custom_loader(p, ispk) # to DefaultLoader
-                load = importlib.util.LazyLoader(load) if self.lazy and not ispk else load # must be check
+                load.lazy = self.lazy and not ispk
+                load = init.LazyLoader(load) if load.lazy else load # must be check, thread safe first access
                 spec = importlib.util.spec_from_loader(name, load, is_package=ispk)
                 if ispk: spec.submodule_search_locations = [] 
                 return spec
@@ -62,23 +70,12 @@ class AbstractMetaFinder(importlib.abc.MetaPathFinder):
     def custom_loader(self, file_path, is_pkg):
         raise NotImplementedError
 
+    def discover(self, name) -> bool : # grow self.tree with name on demand, True if found, trees listed up front never do
+        return False
+
 #####################################
 
-ROT_NUM = 0
-# https://www.unicode.org/emoji/charts/emoji-ordering.html
-ROTTXT1 = ['⬆','↗','➡','↘','⬇','↙','⬅','↖']
-ROTTXT2 = ['🌑','🌘','🌗','🌖','🌕','🌔','🌒','🌒']
-ROTTXT3 = ['🕛','🕐','🕑','🕒','🕓','🕔','🕕','🕖','🕗','🕘','🕙','🕚']
-def ROTATION() -> str:
-    global ROT_NUM
-    ROT_NUM+=1
-    ROTTEXT = ROTTXT2
-    return ROTTEXT[ROT_NUM%len(ROTTEXT)]
-
-L_RESET = '\033[2K\r'
-def PRINT(txt: str) :
-    sys.stdout.write(L_RESET + txt + '\r')
-    sys.stdout.flush()
+trace.progress() # exec progress line on interactive terminals only, see protocol_trace.Progress
 
 class DefaultLoader(importlib.abc.Loader):
     def __init__(self, type, code, pnme, path, ispk): # <- self.lodr <- custom_loader 
@@ -87,30 +84,38 @@ class DefaultLoader(importlib.abc.Loader):
         self.pnme = pnme # pack name 
         self.path = path # file path
         self.ispk = ispk # ispackage
+        self.lazy = False # executed on first attribute access
     def create_module(self, spec): return None # using default spec.loader.create_module(spec)
     def exec_module(self, modl):
         modl.__file__ = self.type + self.path
         modl.__path__ = None if not self.ispk else [self.type + self.path.rsplit("/" , 1)[0]]
         modl.__loader__ = self
-        code = self.code(self.path) 
-        LOG.debug(f"🚀 exec [{modl.__file__}] ...")
-        PRINT(f" {ROTATION()} exec [{modl.__file__}] ...")
-        exec(compile(code, self.path, "exec"), modl.__dict__)
+        with trace.span('module', modl.__name__, file=modl.__file__, lazy=self.lazy) as rec: # None while no hook installed
+            code = self.compile(rec)
+            LOG.debug(f"🚀 exec [{modl.__file__}] ...")
+            with trace.timed(rec, 'exec'): exec(code, modl.__dict__)
+    def compile(self, rec): # code object of self.path, overridden by loaders holding precompiled code
+        with trace.timed(rec, 'fetch'): code = self.code(self.path) 
+        if rec is not None: rec['bytes'] = len(code or '')
+        with trace.timed(rec, 'compile'): return cache.CODE_CACHE.compile(code, self.path, self.type) # marshal cached, keyed by source/magic/type
 
 #####################################
 
 class Singleton(abc.ABCMeta):
     _instances = {}
+    _lock = threading.RLock()
     def __new__(cls, name, bases, namespace) :
         namespace.update(destroy=Singleton.destroy)
         return super().__new__(cls, name, bases, namespace)
 
     def __call__(cls, *args, **kwargs) :
         name = cls.__name__
-        if name not in cls._instances:
-            call = super(Singleton, cls).__call__(*args, **kwargs)
-            LOG.debug(f"[INF] create {name} id[{id(call)}] ...")
-            cls._instances[name] = call 
+        if name in cls._instances: return cls._instances[name]
+        with Singleton._lock:
+            if name not in cls._instances:
+                call = super(Singleton, cls).__call__(*args, **kwargs)
+                LOG.debug(f"[INF] create {name} id[{id(call)}] ...")
+                cls._instances[name] = call 
         return cls._instances[name]
     
     @staticmethod
@@ -122,60 +127,167 @@ class Singleton(abc.ABCMeta):
             LOG.debug(f"[INF] remove {name} id[{id(call)}] ...")
             del cls._instances[name]
 
+IMPORT_WORKERS = 8 # urls fetched at once by imports_many, connections per host are bounded by the shared pools
+class ImportManyError(ImportError): # errors of imports_many by url, the other urls are imported and registered
+    def __init__(self, errors: dict):
+        self.errors = errors
+        super().__init__(f"[ERR] {len(errors)} of the urls failed " + ', '.join(f"[{u}] {e!r}" for u, e in errors.items()))
+
 class RemoteMetaImporter(importlib.abc.MetaPathFinder, metaclass=Singleton):
     def __init__(self):
-        self.bank = {}
+        self.bank = {}  # package name → finder
+        self.index = {} # module name → finder, 'a.b.__init__' indexed as 'a.b'
+        self.tops = {}  # top level package name → [finder...], names outside are never ours
+        self.lock = threading.RLock() # bank, index, sys.meta_path and sys.modules purge, find_spec reads without it
+        self.flight = {} # (url, finder, lazy, isolate) → Future of the import in progress
 
     @classmethod
     def getInstance(cls) :
         return RemoteMetaImporter()
 
     def clean(self, prefix): # purge from already registered
-        for k in list(self.bank): self.bank.pop(k) if k.startswith(prefix) else None
-        for k in list(sys.modules): sys.modules.pop(k) if k.startswith(prefix) else None
+        with self.lock:
+            for k in list(self.bank): self.bank.pop(k) if k.startswith(prefix) else None
+            for k in list(sys.modules): sys.modules.pop(k) if k.startswith(prefix) else None
+            self.reindex()
+
+    def register(self, pnme, find): # index every module of finder, later registration wins
+        with self.lock:
+            old, self.bank[pnme] = self.bank.get(pnme), find
+            if old is not None and old is not find: return self.reindex() # replaced, drop names of old finder
+            self.indexes(find, self.index, self.tops)
+
+    def reindex(self): # rebuilt aside and swapped, concurrent find_spec never sees a partial index
+        with self.lock:
+            index, tops = {}, {}
+            for find in self.bank.values(): self.indexes(find, index, tops)
+            self.index, self.tops = index, tops
+
+    @staticmethod
+    def indexes(find, index, tops):
+        for k in list(find.tree):
+            index[k[:-9] if k.endswith('.__init__') else k] = find
+            owns = tops.setdefault(k.partition('.')[0], []) # a module finder also owns the siblings of its file
+            if find not in owns: owns.append(find)
 
     def imports(self, url, custom_finder: AbstractMetaFinder=None, uselazy:bool = True, isolate=True):
-        if self not in sys.meta_path: sys.meta_path.insert(0, self) # only one instance in meta_path
+        key = (url, custom_finder, uselazy, isolate)
+        task, mine = self.inflight(key, threading.get_ident())
+        if not mine: return task.result() # same url in flight on another thread, share its download
+        with self.landing(key, task), trace.span('import', url):
+            modl = self.bind(*self.fetch(url, custom_finder, uselazy, isolate))
+            task.set_result(modl)
+            return modl
+
+    def imports_many(self, urls, uselazy:bool = True, isolate=True, workers: int = None) -> list : # fetched concurrently, registered in one step, modules in order of urls
+        keys = list(dict.fromkeys((url, None, uselazy, isolate) for url in urls)) # duplicated urls fetched once
+        tasks = {k: self.inflight(k, threading.get_ident()) for k in keys}
+        mine = [k for k in keys if tasks[k][1]]
+        with contextlib.ExitStack() as stack, trace.span('import', ' '.join(k[0] for k in mine)):
+            for k in mine: stack.enter_context(self.landing(k, tasks[k][0]))
+            if mine:
+                def fetch(k): # (finder, package name) or the error of that url, one failure never hides the others
+                    try: return self.fetch(k[0], None, uselazy, isolate)
+                    except Exception as e: return e
+                with ThreadPoolExecutor(max_workers=min(workers or IMPORT_WORKERS, len(mine)), thread_name_prefix='importpy-many') as pool:
+                    found = dict(zip(mine, pool.map(fetch, mine)))
+                with self.lock:
+                    for f in found.values():
+                        if not isinstance(f, Exception): self.register(f[1], f[0])
+                for k, f in found.items():
+                    if isinstance(f, Exception): continue
+                    try: found[k] = (self.bind(*f),)
+                    except Exception as e: found[k] = e
+                for k, f in found.items(): # settled once every bind is over
+                    if isinstance(f, Exception): tasks[k][0].set_exception(f)
+                    else: tasks[k][0].set_result(f[0])
+        modls, errors = [], {}
+        for url in urls:
+            try: modls.append(tasks[(url, None, uselazy, isolate)][0].result())
+            except Exception as e: errors.setdefault(url, e)
+        if errors: raise ImportManyError(errors) from next(iter(errors.values()))
+        return modls
+
+    async def aimports(self, url, custom_finder: AbstractMetaFinder=None, uselazy:bool = True, isolate=True): # loop never blocks on network, only exec runs on it
+        key = (url, custom_finder, uselazy, isolate)
+        task, mine = self.inflight(key, None) # owned by no thread until exec, concurrent coroutines share it too
+        if not mine: return await asyncio.wrap_future(task)
+        with self.landing(key, task), trace.span('import', url):
+            find, pnme = await asyncio.get_running_loop().run_in_executor(None, self.fetch, url, custom_finder, uselazy, isolate, True)
+            task.owner = threading.get_ident()
+            modl = self.bind(find, pnme)
+            task.set_result(modl)
+            return modl
+
+    def inflight(self, key, tid) : # (task, mine), mine if nobody imports key or re-entered from the module being imported
+        with self.lock:
+            if self not in sys.meta_path: sys.meta_path.insert(0, self) # only one instance in meta_path
+            task = self.flight.get(key)
+            mine = task is None or (tid is not None and task.owner == tid)
+            if mine: task = self.flight[key] = Future(); task.owner = tid
+        return task, mine
+
+    @contextlib.contextmanager
+    def landing(self, key, task) :
+        try: yield
+        except BaseException as e:
+            if not task.done(): task.set_exception(e) # settled ones keep their own result or error
+            raise
+        finally:
+            with self.lock:
+                if self.flight.get(key) is task: self.flight.pop(key)
+
+    def fetch(self, url, custom_finder: AbstractMetaFinder=None, uselazy:bool = True, isolate=True, warm=False): # (finder, package name), network only, outside of the lock
         find = self.select(url, uselazy=uselazy) if not custom_finder else custom_finder
         pnme = find.imports(url, self.clean if isolate else None)
-        self.bank[pnme] = find
+        if warm and callable(getattr(find, 'source', None)): # sources exec will need, lazy → package init only
+            impl.prefetch(find, True if not uselazy else lambda f: [n for n in (f.pnme, f"{f.pnme}.__init__") if n in f.tree])
+        return find, pnme
+
+    def bind(self, find, pnme):
+        if self.bank.get(pnme) is not find: self.register(pnme, find)
         modl = importlib.import_module(pnme) # --> to find_spec directly
-        PRINT(f'')
         self.patch_package(find)
         return modl
 
     def find_spec(self, name, path, target=None):
-        spec = next((f.find_spec(name, path, target=target) for f in self.bank.values() if name in f.tree), None)
-        LOG.debug(f"{L_RESET}[CHK] find_spec search outside : {name}")
+        tops = self.tops.get(name.partition('.')[0])
+        if not tops: return None # fast negative, stdlib and site-packages imports
+        find = self.index.get(name)
+        if find is not None: return find.find_spec(name, path, target=target)
+        spec = next((f.find_spec(name, path, target=target) for f in tops if name in f.tree or f"{name}.__init__" in f.tree or f.discover(name)), None) # trees grown after registration
+        if spec is None: LOG.debug(f"[CHK] find_spec search outside : {name}")
         return spec
 
     def patch_package(self, find): # various package pactch for compatibility
         try:
             from pip._vendor.distlib import resources
             resources._finder_registry[find.lodr] = lambda mod: CustomResourceFinder(mod)
-            PRINT(f'')
         except: pass
         pass
 
     def select(self, url, uselazy=True):
-        url = url.lower()
+        url = url.lower().partition('#')[0] # '#sha256=' fragment of pinned archives
         if False: pass
         elif url.startswith(('http://', 'https://')):
             type = url.partition('://')[0]
             if False : pass
             elif url.endswith((".zip", ".whl")):    return impl.ZipMetaFinder(type=f'{type}-zip://', uselazy=uselazy, as_finder_role=False)
             elif url.endswith((".tar.gz", ".tgz")): return impl.TgzMetaFinder(type=f'{type}-tgz://', uselazy=uselazy, as_finder_role=False)
+            elif url.endswith(".ipyb"):             return impl.BundleMetaFinder(type=f'{type}-ipyb://', uselazy=uselazy, as_finder_role=False)
             elif "github.com" in url:               return impl.GitMetaFinder(type=f'{type}-git://', uselazy=uselazy, as_finder_role=False)
             else:                                   return impl.WebMetaFinder(type=f'{type}://'    , uselazy=uselazy, as_finder_role=False)
         elif url.startswith('file://'):             
             if False : pass
             elif url.endswith((".zip", ".whl")):    return impl.ZipMetaFinder(type='file-zip://', uselazy=uselazy, as_finder_role=False)
             elif url.endswith((".tar.gz", ".tgz")): return impl.TgzMetaFinder(type='file-tgz://', uselazy=uselazy, as_finder_role=False)
+            elif url.endswith(".ipyb"):             return impl.BundleMetaFinder(type='file-ipyb://', uselazy=uselazy, as_finder_role=False)
             else:                                   return impl.FleMetaFinder(uselazy=uselazy, as_finder_role=False)
         elif url.startswith('ftp://'):
             if False : pass
             elif url.endswith((".zip", ".whl")):    return impl.ZipMetaFinder(type='ftp-zip://', uselazy=uselazy, as_finder_role=False)
             elif url.endswith((".tar.gz", ".tgz")): return impl.TgzMetaFinder(type='ftp-tgz://', uselazy=uselazy, as_finder_role=False)
+            elif url.endswith(".ipyb"):             return impl.BundleMetaFinder(type='ftp-ipyb://', uselazy=uselazy, as_finder_role=False)
             else:                                   return impl.FtpMetaFinder(uselazy=uselazy, as_finder_role=False)    
         else:
             raise ValueError(f"[ERR] unknown protocol [{url}]")
@@ -0,0 +1,101 @@
+import os, io, sys, mmap, struct, marshal
+import importlib.util
+
+import logging
+LOG = logging.getLogger(__name__)
+
+try: from . import __init__ as init # register as sys.modules['importpy'], run with package
+except: import __init__ as init     # register as sys.modules['__init__'], run with direct
+init = init.__self__ if type(init).__name__ == 'method-wrapper' else init # else init is 'module'
+cache = init.loader('./protocol_cache.py')
+
+##################################### bundle, one file per package, mmap friendly
+# [header][code/source/resource blobs ...][marshalled index]
+# header : b'IPYB', format version, importlib MAGIC of the compiling interpreter, index offset, index size
+# index  : {'pnme', 'type', 'url', 'mods': {dotted: (code offset, code size, source offset, source size, ispk)}, 'dirs': [dotted...], 'rsrc': {name: (offset, size)}}
+
+BUNDLE_SIGN = b'IPYB'
+BUNDLE_VERSION = 1
+BUNDLE_HEAD = struct.Struct('<4sH4sQQ')
+BUNDLE_EXT = '.ipyb'
+MAGIC = importlib.util.MAGIC_NUMBER
+
+def build(find, path: str, url: str = '') -> str : # convert a finder, already imported, into a bundle file
+    mods, dirs, rsrc = {}, [], {}
+    def write(f):
+        f.write(b'\0' * BUNDLE_HEAD.size)
+        def blob(data: bytes):
+            off = f.tell()
+            f.write(data)
+            return off, len(data)
+        for key, where in sorted(find.tree.items()):
+            if not str(where).endswith('.py'): dirs.append(key); continue # namespace directory
+            text = find.sourcecode(key)
+            text = text.decode('utf-8') if isinstance(text, (bytes, memoryview)) else (text or '')
+            code = compile(text, key, "exec") # same file name as DefaultLoader
+            mods[key] = blob(marshal.dumps(code)) + blob(text.encode('utf-8', 'surrogatepass')) + (key.endswith('.__init__'),)
+        arch = getattr(find, 'inst', None)
+        if hasattr(arch, 'namelist'): # zip resources, CustomResourceFinder reads them back through Bundle.read
+            for name in arch.namelist():
+                if not name.endswith(('/', '.py')): rsrc[name] = blob(arch.read(name))
+        index = marshal.dumps({'pnme': find.pnme, 'type': find.type, 'url': url, 'mods': mods, 'dirs': dirs, 'rsrc': rsrc})
+        ioff = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(BUNDLE_HEAD.pack(BUNDLE_SIGN, BUNDLE_VERSION, MAGIC, ioff, len(index)))
+    cache.atomic_write(os.path.abspath(path), write)
+    LOG.debug(f"[INF] bundled [{find.pnme}] {len(mods)} modules, {len(rsrc)} resources → [{path}]")
+    return path
+
+class Bundle: # read side, index unmarshalled once, code/source/resources sliced on demand
+    def __init__(self, obj): # path or io.BytesIO
+        if isinstance(obj, str):
+            with open(obj, 'rb') as f: self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.map)
+        else:
+            self.map = None
+            self.view = obj.getbuffer() if hasattr(obj, 'getbuffer') else memoryview(obj)
+        if len(self.view) < BUNDLE_HEAD.size: raise ValueError(f"[ERR] not a bundle ...")
+        sign, version, magic, ioff, ilen = BUNDLE_HEAD.unpack_from(self.view, 0)
+        if sign != BUNDLE_SIGN or version != BUNDLE_VERSION: raise ValueError(f"[ERR] not a bundle or unsupported version [{sign}:{version}] ...")
+        self.fresh = magic == MAGIC # compiled by this interpreter, else recompiled from the bundled source
+        self.index = marshal.loads(self.view[ioff:ioff + ilen])
+        self.mods = self.index['mods']
+        self.rsrc = self.index['rsrc']
+
+    def tree(self) -> dict :
+        return {k:k for k in list(self.mods) + self.index['dirs']}
+
+    def code(self, key: str) :
+        if key not in self.mods: return None
+        coff, clen, soff, slen, _ = self.mods[key]
+        if self.fresh: return marshal.loads(self.view[coff:coff + clen])
+        return compile(self.source(key), key, "exec")
+
+    def source(self, key: str) -> str :
+        if key not in self.mods: return ''
+        coff, clen, soff, slen, _ = self.mods[key]
+        return str(self.view[soff:soff + slen], 'utf-8', 'surrogatepass')
+
+    def namelist(self) -> list : return list(self.rsrc)
+    def read(self, name: str) -> bytes :
+        off, size = self.rsrc[name]
+        return bytes(self.view[off:off + size])
+
+##################################### command line, python -m importpy.protocol_bundle URL [OUT]
+
+def main(argv=None) -> int :
+    import argparse
+    from importpy.protocol import RemoteMetaImporter
+    pars = argparse.ArgumentParser(prog='python -m importpy.protocol_bundle', description='convert a remote/local package source into an importpy bundle')
+    pars.add_argument('url', help='package source, ie, https://.../pkg, file://.../pkg-1.0.whl, ftp://.../pkg')
+    pars.add_argument('out', nargs='?', help=f'bundle path, default ./<package>{BUNDLE_EXT}')
+    args = pars.parse_args(argv)
+    find = RemoteMetaImporter.getInstance().select(args.url)
+    pnme = find.imports(args.url)
+    path = build(find, args.out or f"{pnme}{BUNDLE_EXT}", args.url)
+    print(f"[INF] bundled [{pnme}] → [{path}]")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import os, re, json, time, marshal, hashlib, tempfile, threading, contextlib
+import importlib.util, urllib.parse
+
+import logging
+LOG = logging.getLogger(__name__)
+
+try: from . import __init__ as init # register as sys.modules['importpy'], run with package
+except: import __init__ as init     # register as sys.modules['__init__'], run with direct
+init = init.__self__ if type(init).__name__ == 'method-wrapper' else init # else init is 'module'
+trace = init.loader('./protocol_trace.py')
+
+#####################################
+
+CACHE_ENV = 'IMPORTPY_CACHE'         # cache root directory, empty string disables every disk cache
+CACHE_SIZE_ENV = 'IMPORTPY_CACHE_MB' # size limit of each cache kind in megabytes
+CACHE_SIZE = 256 * 1024 * 1024
+
+def cache_root() -> str :
+    root = os.environ.get(CACHE_ENV)
+    if root is None: root = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'), 'importpy')
+    return root.replace('\\', '/').rstrip('/') if root else ''
+
+def cache_size() -> int :
+    try: return int(float(os.environ[CACHE_SIZE_ENV]) * 1024 * 1024)
+    except: return CACHE_SIZE
+
+def atomic_write(path: str, data) -> str : # write to a sibling temp file, then rename over, readers never see partial files
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f: data(f) if callable(data) else f.write(data) # bytes or writer(file)
+        os.replace(temp, path)
+    except:
+        try: os.remove(temp)
+        except OSError: pass
+        raise
+    return path
+
+class DiskCache:
+    def __init__(self, kind: str, root: str = None, limit: int = None):
+        self.kind = kind   # sub directory ie, code, artifact
+        self.root = root   # None → resolved from environ on every access
+        self.limit = limit # None → resolved from environ on every access
+        self.used = None   # bytes in use, scanned lazily
+        self.last = None   # last resolved base, rescan when changed
+        self.hits = 0
+        self.miss = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base(self) -> str :
+        root = cache_root() if self.root is None else self.root
+        return f"{root}/{self.kind}" if root else ''
+
+    def path(self, key: str) -> str :
+        return f"{self.base}/{key}"
+
+    def get(self, key: str) -> bytes :
+        if not self.base: return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f: data = f.read()
+        except OSError:
+            self.miss += 1
+            return None
+        try: os.utime(path) # bump mtime, eviction order is least recently used
+        except OSError: pass # read-only cache, ie, baked into an image
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data) -> str :
+        if not self.base: return None
+        try: path = atomic_write(self.path(key), data)
+        except OSError as e: LOG.debug(f"[ERR] cache write failed [{key}] {e}"); return None
+        self.account(os.path.getsize(path) if callable(data) else len(data))
+        return path
+
+    def produce(self, key: str, writer) -> str : # path of cached file, built once across processes by writer(file)
+        if not self.base: return None
+        path = self.path(key)
+        try:
+            if not os.path.isfile(path):
+                with self.locked(key):
+                    if not os.path.isfile(path): self.miss += 1; atomic_write(path, writer); self.account(os.path.getsize(path)); return path
+        except OSError as e:
+            LOG.debug(f"[ERR] cache produce failed [{key}] {e}")
+            return None
+        try: os.utime(path)
+        except OSError: pass # read-only cache
+        self.hits += 1
+        return path
+
+    def account(self, size: int) :
+        with self.lock:
+            if self.used is None or self.last != self.base: self.used = sum(s for _, s, _ in self.entries()); self.last = self.base
+            else: self.used += size
+            if self.used > (self.limit or cache_size()): self.evict()
+
+    def entries(self) : # [(path, size, mtime)...] of cached files
+        try: scan = list(os.scandir(self.base))
+        except OSError: return []
+        ents = []
+        for e in scan:
+            if e.name.startswith('.'): continue # .tmp-* and .lock-* in progress
+            try: s = e.stat(); ents.append((e.path, s.st_size, s.st_mtime))
+            except OSError: pass
+        return ents
+
+    def evict(self) : # drop least recently used files until 80% of limit
+        goal = (self.limit or cache_size()) * 0.8
+        ents = sorted(self.entries(), key=lambda e: e[2])
+        self.used = sum(s for _, s, _ in ents)
+        for path, size, _ in ents:
+            if self.used <= goal: break
+            try: os.remove(path); self.used -= size
+            except OSError: pass
+        LOG.debug(f"[INF] cache evicted [{self.base}] → {self.used} bytes")
+
+    @contextlib.contextmanager
+    def locked(self, key: str, wait: float = 60.0) : # cross process lock file, one producer per key, stale after wait
+        lock = f"{self.base}/.lock-{key}"
+        till = time.monotonic() + wait
+        fd = None
+        while fd is None:
+            try: os.makedirs(self.base, exist_ok=True); fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if wait < time.time() - os.path.getmtime(lock): os.remove(lock); continue
+                except OSError: continue
+                if till < time.monotonic(): LOG.debug(f"[ERR] cache lock timeout [{lock}]"); break # proceed unlocked
+                time.sleep(0.05)
+            except OSError as e: LOG.debug(f"[ERR] cache not writable [{lock}] {e}"); break # proceed unlocked, callers fall back to memory/spool
+        try: yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+                try: os.remove(lock)
+                except OSError: pass
+
+    def clear(self) :
+        for path, _, _ in self.entries():
+            try: os.remove(path)
+            except OSError: pass
+        self.used = 0
+
+#####################################
+
+MAGIC = importlib.util.MAGIC_NUMBER
+class CodeCache(DiskCache):
+    def __init__(self, root: str = None, limit: int = None):
+        super().__init__('code', root, limit)
+
+    def key(self, source, path: str, type: str) -> str : # content addressed, interpreter and finder aware
+        hash = hashlib.sha256(MAGIC)
+        hash.update(f"{type}\0{path}\0".encode('utf-8', 'surrogatepass'))
+        hash.update(source if isinstance(source, bytes) else source.encode('utf-8', 'surrogatepass'))
+        return hash.hexdigest()
+
+    def compile(self, source, path: str, type: str = ''):
+        if not source or not self.base: trace.note(cache='off'); return compile(source, path, "exec")
+        key = self.key(source, path, type)
+        data = self.get(key)
+        if data and data[:len(MAGIC)] == MAGIC:
+            try: code = marshal.loads(memoryview(data)[len(MAGIC):]); trace.note(cache='hit'); return code
+            except Exception as e: LOG.debug(f"[ERR] broken code cache [{key}] {e}")
+        trace.note(cache='miss')
+        code = compile(source, path, "exec")
+        self.put(key, MAGIC + marshal.dumps(code))
+        return code
+
+CODE_CACHE = CodeCache()
+
+#####################################
+
+PINNED_HOSTS = ('files.pythonhosted.org',) # content addressed hosts, never revalidated
+PINNED_HASH_RE = re.compile(r"#sha256=(?P<hash>[0-9a-fA-F]{64})")
+PINNED_COMMIT_RE = re.compile(r"#commit=[0-9a-fA-F]{40}$") # archive of a git commit, immutable
+def pinned(url: str) -> str : # pinned key of url, '' if mutable
+    hash = PINNED_HASH_RE.search(url)
+    if hash: return f"sha256-{hash.group('hash').lower()}"
+    if urllib.parse.urlsplit(url).hostname in PINNED_HOSTS or PINNED_COMMIT_RE.search(url): return f"url-{hashlib.sha256(url.encode()).hexdigest()}"
+    return ''
+
+class ArtifactCache(DiskCache):
+    def __init__(self, root: str = None, limit: int = None):
+        super().__init__('artifact', root, limit)
+
+    def key(self, url: str) -> str :
+        return pinned(url) or hashlib.sha256(url.encode()).hexdigest()
+
+    def lookup(self, url: str) : # (path, meta) of cached artifact, (None, {}) if missing
+        if not self.base: return None, {}
+        path = self.path(self.key(url))
+        try:
+            with open(path + '.json', 'r', encoding='utf-8') as f: meta = json.load(f)
+            if not os.path.isfile(path): raise OSError(path)
+        except (OSError, ValueError):
+            self.miss += 1
+            return None, {}
+        self.hits += 1
+        return path, meta
+
+    def store(self, url: str, data, meta: dict) -> str : # data bytes or writer(file), a writer puts 'sha256' into meta
+        path = self.put(self.key(url), data)
+        if not path: return None
+        meta = dict(meta, url=url, size=os.path.getsize(path), fetched=time.time())
+        if not callable(data): meta['sha256'] = hashlib.sha256(data).hexdigest()
+        self.put(self.key(url) + '.json', json.dumps(meta).encode())
+        return path
+
+    def touch(self, url: str, meta: dict) : # revalidated, refresh meta and lru order
+        path = self.path(self.key(url))
+        try: os.utime(path)
+        except OSError: pass
+        self.put(self.key(url) + '.json', json.dumps(dict(meta, fetched=time.time())).encode())
+
+ARTIFACT_CACHE = ArtifactCache()
+TAR_CACHE = DiskCache('tar') # gunzipped sdists, random access members
@@ -1,10 +1,11 @@
-import os, io, sys, json, re
+import os, io, sys, json, re, shutil, time, mmap, struct, gzip, atexit, bisect, hashlib, tempfile, threading, http.client
 import urllib.request, urllib.parse
 import zipfile, tarfile
 import importlib.abc, importlib.util
-from ftplib import FTP
+from ftplib import FTP, error_perm
 from html.parser import HTMLParser
-from urllib.error import URLError
+from urllib.error import URLError, HTTPError
+from concurrent.futures import ThreadPoolExecutor
 
 import logging
 LOG = logging.getLogger(__name__)
@@ -13,42 +14,159 @@ try: from . import __init__ as init # register as sys.modules['importpy'], run w
 except: import __init__ as init     # register as sys.modules['__init__'], run with direct
 init = init.__self__ if type(init).__name__ == 'method-wrapper' else init # else init is 'module'
 protocol, AbstractMetaFinder = init.loader('./protocol.py', '*', 'AbstractMetaFinder')
-
-def fetch2mem(url, buffer=8192):
+cache = init.loader('./protocol_cache.py')
+pools = init.loader('./protocol_pool.py')
+bundle = init.loader('./protocol_bundle.py')
+trace = init.loader('./protocol_trace.py')
+manifest = init.loader('./protocol_manifest.py')
+
+SPOOL_MAX = 16 * 1024 * 1024 # downloads kept in memory up to this size, spooled to a temp file past it
+READ_MIN = 64 * 1024          # first read size, doubled while reads come back full
+READ_MAX = 4 * 1024 * 1024
+RESUME_TRIES = 3              # Range requests after a dropped connection
+RANGE_MIN = 4 * 1024 * 1024   # remote zips at least this large are read with Range requests, None → always downloaded
+RANGE_TAIL = 64 * 1024        # first Range request, end of central directory and usually the whole directory
+RANGE_GAP = 32 * 1024         # member ranges closer than this are fetched by one request
+
+def fetch2mem(url, buffer=None): # io.BytesIO, or path of a cached/spooled file
+    with trace.span('fetch', url) as rec:
+        data = fetch2any(url, buffer)
+        if rec is not None: rec['bytes'] = os.path.getsize(data) if isinstance(data, str) else data.getbuffer().nbytes if data else 0
+    return data
+
+def fetch2any(url, buffer=None):
     if url.startswith('file://'):
-        path = url.rpartition('://')[2]
+        path = url.rpartition('://')[2].partition('#')[0]
         return path
     elif url.startswith('ftp://'):
-        _user, _pass, _host, _port, _path = ftp_info(url)
-        ftp = ftp_connect(_host, _port, _user, _pass) 
-        mem = io.BytesIO()
-        ftp.retrbinary(f"RETR {_path}", mem.write)
-        mem.seek(0)
-        return mem
+        _user, _pass, _host, _port, _path = ftp_info(url.partition('#')[0])
+        return ftp_download((_host, _port, _user, _pass), _path, url)
 
     try:
-        req = urllib.request.urlopen(urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"}))
-        tot = int(req.headers.get("Content-Length", 0))
-        LOG.debug(f"[INF] downloading: {url} ({tot} bytes)")
-        mem = io.BytesIO()
-        got = 0
-        while True:
-            chunk = req.read(buffer)
-            if not chunk:
-                break
-            mem.write(chunk)
-            got += len(chunk)
-            percent = (got / tot) * 100 if tot else 0
-            LOG.debug(f"\r[INF] {got}/{tot} bytes ({percent:.2f}%)")
-        LOG.debug("[INF] fetch2mem complete!")
-        mem.seek(0)
-        return mem
+        if cache.ARTIFACT_CACHE.base: return fetch2cache(url, buffer) # path of cached artifact
+        with pools.urlopen(url) as req: return spool(req, url, buffer)
+    except ValueError: raise # sha256 mismatch, never served
     except Exception as e:
         LOG.debug(f"[ERR] fetch2mem failed: {e}")
         return None
-    
+
+class Spooled(str): # path of a spooled temp file, removed by release() once its consumer holds it open
+    pass
+
+SPOOLED = set() # spooled temp files not released yet, removed at exit
+class Spool: # memory until limit, then a temp file released by its consumer
+    def __init__(self, limit: int = None):
+        self.limit = SPOOL_MAX if limit is None else limit
+        self.file = io.BytesIO()
+        self.path = None
+    def write(self, data) :
+        if self.path is None and self.limit < self.file.tell() + len(data):
+            fd, path = tempfile.mkstemp(prefix='importpy-', suffix='.spool')
+            self.path = Spooled(path)
+            SPOOLED.add(self.path)
+            disk = os.fdopen(fd, 'w+b')
+            disk.write(self.file.getbuffer())
+            self.file = disk
+        return self.file.write(data)
+    def seek(self, pos, whence=0): return self.file.seek(pos, whence)
+    def tell(self): return self.file.tell()
+    def truncate(self, size=None): return self.file.truncate(size)
+    def result(self) : # io.BytesIO or path of temp file
+        if self.path is None: self.file.seek(0); return self.file
+        self.file.close()
+        return self.path
+
+def remove(path: str) :
+    try: os.remove(path)
+    except OSError: pass
+
+def release(obj) : # unlink a spooled temp file once opened/mapped/copied (posix frees it on close), no-op for cached or local paths
+    if not isinstance(obj, Spooled): return
+    try: os.remove(obj); SPOOLED.discard(obj)
+    except FileNotFoundError: SPOOLED.discard(obj)
+    except OSError: pass # still open on windows, retried on close or at exit
+
+@atexit.register
+def release_all() :
+    for path in list(SPOOLED): remove(path)
+
+def spool(req, url, buffer=None) :
+    sink = Spool(0 if SPOOL_MAX < int(req.headers.get('Content-Length') or 0) else None) # known large, straight to disk
+    download(req, url, sink, buffer)
+    return sink.result()
+
+def expected(url: str) -> str : # sha256 of '#sha256=' fragment, '' if not pinned by hash
+    hash = cache.PINNED_HASH_RE.search(url)
+    return hash.group('hash').lower() if hash else ''
+
+def verify(hash, url: str) -> str :
+    want, got = expected(url), hash.hexdigest()
+    if want and want != got: raise ValueError(f"[ERR] sha256 mismatch [{url}] expected {want} but got {got} ...")
+    return got
+
+def download(req, url, sink, buffer=None) -> str : # stream req into sink, sha256 on the fly, resumed with Range, returns hex digest
+    tot = int(req.headers.get("Content-Length") or 0)
+    tag = req.headers.get('ETag') or req.headers.get('Last-Modified')
+    LOG.debug(f"[INF] downloading: {url} ({tot} bytes)")
+    hash, got, size, tries = hashlib.sha256(), 0, buffer or READ_MIN, RESUME_TRIES
+    while True:
+        try:
+            while True:
+                tick = time.monotonic()
+                chunk = req.read(size)
+                if not chunk: break
+                sink.write(chunk)
+                hash.update(chunk)
+                got += len(chunk)
+                if len(chunk) == size and time.monotonic() - tick < 0.5: size = min(size * 2, READ_MAX) # adaptive, fewer syscalls on fast links
+            if tot and got < tot: raise ConnectionError(f"short read {got}/{tot}")
+            break
+        except (OSError, http.client.HTTPException) as e:
+            req.close()
+            if not tries or not got or not tag: raise
+            tries -= 1
+            LOG.debug(f"[INF] resume [{url}] from {got} bytes {e}")
+            req = pools.urlopen(url, headers={'Range': f'bytes={got}-', 'If-Range': tag})
+            if req.status != 206: # changed or range ignored, restart with the new body's length and validator
+                hash, got = hashlib.sha256(), 0; sink.seek(0); sink.truncate()
+                tot, tag = int(req.headers.get("Content-Length") or 0), req.headers.get('ETag') or req.headers.get('Last-Modified')
+    LOG.debug(f"[INF] fetch2mem complete! {got} bytes")
+    return verify(hash, url)
+
+def fetch2cache(url, buffer=8192) -> str : # disk cached download, revalidated with ETag/Last-Modified, pinned urls never revalidated
+    arch = cache.ARTIFACT_CACHE
+    path, meta = arch.lookup(url)
+    if path and cache.pinned(url): trace.note(cache='hit'); return path
+    when = time.time()
+    with arch.locked(arch.key(url)): # workers booting together share one download
+        path, meta = arch.lookup(url)
+        if path and (cache.pinned(url) or when <= meta.get('fetched', 0)): trace.note(cache='hit'); return path # fetched by another process meanwhile
+        head = {}
+        if path and meta.get('etag'): head['If-None-Match'] = meta['etag']
+        if path and meta.get('modified'): head['If-Modified-Since'] = meta['modified']
+        try: req = pools.urlopen(url, headers=head)
+        except HTTPError as e:
+            if e.code != 304 or not path: raise
+            LOG.debug(f"[INF] not modified, serve from cache: {url}")
+            trace.note(cache='304')
+            arch.touch(url, meta)
+            return path
+        meta = {'etag': req.headers.get('ETag'), 'modified': req.headers.get('Last-Modified')}
+        trace.note(cache='miss')
+        with req: path = arch.store(url, lambda f: meta.update(sha256=download(req, url, f, buffer)), meta) # streamed into the cache, verified before rename
+        if path: return path
+    with pools.urlopen(url) as req: return spool(req, url, buffer) # cache not writable
+
+def ftp_download(auth, path: str, url: str) : # spooled and verified like http, resumed with REST on a fresh session
+    sink, hash = Spool(), hashlib.sha256()
+    def write(data): sink.write(data); hash.update(data)
+    pools.FTP_POOL.call(auth, lambda ftp: ftp.retrbinary(f"RETR {path}", write, blocksize=READ_MIN, rest=sink.tell() or None))
+    verify(hash, url)
+    return sink.result()
+
 def fetch2file(url, file: str) :
     mem = fetch2mem(url)
+    if isinstance(mem, str): shutil.copyfile(mem, file); release(mem); return
     with open(file, "wb") as f:
         f.write(mem.getbuffer())
     pass
@@ -57,17 +175,15 @@ def hasfile(url: str) -> bool :
     try:
         if False: pass
         elif url.startswith('file://'):
-            path = url.rpartition('://')[2]
+            path = url.rpartition('://')[2].partition('#')[0]
             return os.path.exists(path)
         elif url.startswith(('http://', 'https://')):
-            with urllib.request.urlopen(url, timeout=1) as r: return r.status == 200
+            return http_probe(url, timeout=1, cached=False)['status'] == 200 # HEAD, no body transfer
         elif url.startswith('ftp://'):
-            _user, _pass, _host, _port, _path = ftp_info(url)
-            ftp = ftp_connect(_host, _port, _user, _pass) 
+            _user, _pass, _host, _port, _path = ftp_info(url.partition('#')[0])
             dir = _path.rpartition('/')[0]
             fle = _path.rpartition('/')[2]
-            ftp.cwd(dir)
-            lst = [n for n, f in ftp.mlsd() if f.get("type") == "file"]
+            lst = [n for n, f in pools.FTP_POOL.mlsd((_host, _port, _user, _pass), dir or '/') if f.get("type") == "file"]
             return any(n == fle for n in lst) # generator debuging work hard ~~~ ㅠㅠ
         elif url.startswith('sftp://'):
             pass
@@ -88,43 +204,101 @@ def ftp_info(url: str) :
     return _user, _pass, _host, _port, _path.rstrip('/')
 
 def ftp_connect(host, port='21', usr='', pwd='') -> FTP:
-    _ftp = FTP()
-    _ftp.connect(host, int(port) if port else 21)
-    _ftp.login(user=usr if usr else 'anonymouse', passwd= pwd if pwd else 'password@')
-    return _ftp
-
-def ftp_files(_ftp, path='.', depth=0, extension=''):
-    def isdir(_ftp, path):
-        try: _ftp.cwd(path); return True
-        except: return False
+    return pools.ftp_login(host, port, usr, pwd)
+
+CRAWL_WORKERS = 8    # concurrent listings per level
+CRAWL_DEPTH = 32     # max directory depth below root
+CRAWL_FANOUT = 4096  # max entries taken from one listing
+
+def crawl(root, listing, isdir=None, extension='', workers=CRAWL_WORKERS, depth=0, kind=None) -> list : # level by level, concurrent within a level
+    kind = {} if kind is None else kind # path → isdir of every entry kept
+    kind[root] = True
+    files = [root]
+    seen = {root}
+    level = [root]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='importpy-crawl') as pool:
+        while level and depth < CRAWL_DEPTH:
+            ents = {} # {path: isdir or None}
+            for dir, ls in zip(level, pool.map(listing, level)):
+                if CRAWL_FANOUT < len(ls): LOG.warning(f"[WRN] listing truncated [{dir}] {len(ls)} entries, first {CRAWL_FANOUT} kept (CRAWL_FANOUT)")
+                ents.update((p, d) for p, d in ls[:CRAWL_FANOUT] if p not in seen and p not in ents)
+            seen.update(ents)
+            what = iter(pool.map(isdir, [p for p, d in ents.items() if d is None]) if isdir else []) # classify unknown entries
+            level = []
+            for path, d in ents.items():
+                d = next(what) if d is None and isdir else d
+                if d: files.append(path); level.append(path); kind[path] = True
+                elif path.endswith(extension): files.append(path); kind[path] = False
+            depth += 1
+    if level: LOG.warning(f"[WRN] crawl truncated [{root}] {len(level)} directories below depth {CRAWL_DEPTH} not listed (CRAWL_DEPTH)")
+    return files
+
+def ftp_files(auth, path='.', depth=0, extension='', workers=CRAWL_WORKERS, kind=None): # auth is (host, port, user, pass) of FTP_POOL
+    def isdir(auth, path): # path independent, no cwd
+        if path in ('', '/'): return True
+        try: return any(n == path.rpartition('/')[2] and f.get('type') == 'dir' for n, f in pools.FTP_POOL.mlsd(auth, path.rpartition('/')[0] or '/'))
+        except error_perm: return False
     ftp_files.isdir = isdir # tricky for access
-    def source(_ftp, path='.') :
-        mem = io.BytesIO()
-        _ftp.retrbinary(f"RETR {path}", mem.write)
-        mem.seek(0)
-        return mem.read().decode("utf-8")
-    ftp_files.source = source # tricky for access
-
-    path = path if 0 < depth or isdir(_ftp, path) else path.rpartition('/')[0]
-    _ftp.cwd(path)
-    list = []
-    list.append(path)
-    for name, fact in _ftp.mlsd():
-        type = fact.get('type')
-        file = f'{path}/{name}' if path != '/' else f'/{name}'
-        if type == 'dir': list.extend(ftp_files(_ftp, file, depth+1)); _ftp.cwd('..')
-        elif type == 'file' and name.endswith(extension): list.append(file)
-    return list
-
-def http_files(path='.', depth=0, extension=''):
+    ftp_files.source = ftp_source # tricky for access
+    def listing(dir): 
+        return [(f'{dir}/{name}' if dir != '/' else f'/{name}', fact.get('type') == 'dir') for name, fact in pools.FTP_POOL.mlsd(auth, dir or '/') if fact.get('type') in ('dir', 'file')]
+
+    path = path if 0 < depth or isdir(auth, path) else path.rpartition('/')[0]
+    return crawl(path, listing, extension=extension, workers=workers, depth=depth, kind=kind)
+
+def ftp_source(auth, path='.') :
+    return pools.FTP_POOL.retr(auth, path).decode("utf-8")
+ftp_files.source = ftp_source # before any crawl, a manifest listed package never crawls
+
+HTTP_KIND = {}      # url → {'status', 'dir', 'size', 'etag'}, classified once while crawling, oldest dropped past HTTP_KIND_MAX
+HTTP_KIND_MAX = 8192
+HTTP_KIND_LOCK = threading.Lock()
+HTTP_NOHEAD = set() # hosts refusing HEAD, probed with GET
+def http_keep(kinds: dict) :
+    with HTTP_KIND_LOCK:
+        HTTP_KIND.update(kinds)
+        while HTTP_KIND_MAX < len(HTTP_KIND): del HTTP_KIND[next(iter(HTTP_KIND))]
+
+def http_forget(root) : # entries of a package, dropped when it is imported again
+    with HTTP_KIND_LOCK:
+        for url in [u for u in HTTP_KIND if u == root or u.startswith(root + '/')]: del HTTP_KIND[url]
+
+def http_probe(url, timeout=None, cached=True, method=None, hops=0) -> dict :
+    kind = HTTP_KIND.get(url) if cached else None
+    if kind is not None: return kind
+    if pools.HTTP_REDIRECTS < hops: raise HTTPError(url, 310, f"[ERR] too many redirects", None, None)
+    host = urllib.parse.urlsplit(url).netloc
+    meth = method or ('GET' if host in HTTP_NOHEAD else 'HEAD')
+    try: resp = pools.urlopen(url, method=meth, timeout=timeout, follow=False)
+    except HTTPError as e:
+        if meth != 'HEAD' or e.code not in (400, 403, 405, 501): raise
+        if e.code in (405, 501): HTTP_NOHEAD.add(host); return http_probe(url, timeout, cached, None, hops)
+        kind = http_probe(url, timeout, cached, 'GET', hops) # 400/403 also means a missing key on S3 style hosts, marked once GET answers
+        HTTP_NOHEAD.add(host)
+        return kind
+    with resp:
+        dest = urllib.parse.urljoin(url, resp.headers['Location']) if 300 <= resp.status else None
+        if dest is None: kind = http_kind(resp)
+        elif dest == url + '/': kind = {'status': 200, 'dir': True, 'size': None, 'etag': None, 'ranges': False} # 'pkg' → 'pkg/', the listing is fetched by the crawl anyway
+    if dest is not None and dest != url + '/': return http_probe(dest, timeout, cached, method, hops + 1)
+    http_keep({url: kind})
+    return kind
+
+def http_exists(url) -> bool : # 200 by HEAD (GET where refused), misses are not cached here
+    try: return http_probe(url)['status'] == 200
+    except (HTTPError, URLError): return False
+
+def http_kind(resp) -> dict :
+    size = resp.headers.get('Content-Length')
+    return {'status': resp.status, 'dir': "text/html" in resp.headers.get('Content-Type', ''), 'size': int(size) if size and size.isdigit() else None, 'etag': resp.headers.get('ETag'),
+            'ranges': resp.headers.get('Accept-Ranges', '').strip().lower() == 'bytes'}
+
+def http_files(path='.', depth=0, extension='', workers=CRAWL_WORKERS):
     def isdir(url):
-        try: return "text/html" in urllib.request.urlopen(url).headers.get('Content-Type', '')
+        try: return http_probe(url)['dir']
         except: return False    
     http_files.isdir = isdir # tricky for access
-    def source(path) :
-        code = urllib.request.urlopen(path).read().decode()
-        return code
-    http_files.source = source # tricky for access
+    http_files.source = http_source # tricky for access
     class HTTPLinkExtractor(HTMLParser):
         def __init__(self, base):
             super().__init__()
@@ -133,21 +307,44 @@ def http_files(path='.', depth=0, extension=''):
         def handle_starttag(self, tag, attrs):
             if tag == "a": self.link.extend(l for n, v in attrs if n == "href" and (l:=urllib.parse.urljoin(self.base, v)).startswith(self.base))
 
+    def listing(path):
+        resp = pools.urlopen(path)
+        html = resp.read().decode("utf-8")
+        kind = http_kind(resp)
+        http_keep({path: kind, resp.geturl(): kind})
+        pasr = HTTPLinkExtractor(resp.geturl() if resp.geturl().endswith('/') else path) # 'pkg' redirected to 'pkg/', relative links resolve against 'pkg/'
+        pasr.feed(html)
+        return [(l, True if l.endswith('/') else None) for l in dict.fromkeys(pasr.link)] # 'sub/' is listed next level, others classified by HEAD
+
     path = path if 0 < depth or isdir(path) else path.rpartition('/')[0]
-    html = urllib.request.urlopen(path).read().decode("utf-8")
-    pasr = HTTPLinkExtractor(path)
-    pasr.feed(html)
-
-    files = []
-    files.append(path)
-    for link in pasr.link:
-        if isdir(link):
-            files.append(link)
-            files.extend(http_files(link, depth+1, extension))
-        elif link.endswith(extension):
-            files.append(link)
+    return crawl(path, listing, isdir, extension, workers, depth)
 
-    return files
+def http_source(path) :
+    code = pools.urlopen(path).read().decode()
+    return code
+http_files.source = http_source # before any crawl, lazy discovery never crawls
+
+#####################################
+
+PREFETCH = False      # default of remote finders, True, [dotted prefix...] or callable(finder) → [dotted name...]
+WEB_CRAWL = True      # default of WebMetaFinder, True crawls the whole tree on import, False probes names when python asks for them
+PREFETCH_WORKERS = 8
+def prefetched(find, names=True) -> list : # dotted names selected by a PREFETCH value
+    if callable(names): return names(find)
+    elif names is True: return list(find.tree)
+    else: return [n for n in find.tree if any(n == p or n.startswith(p + '.') for p in names)]
+
+def prefetch(find, names=True, workers: int = PREFETCH_WORKERS) -> int : # download sources concurrently into find.bank
+    paths = [p for p in dict.fromkeys(find.tree[n] for n in prefetched(find, names) if n in find.tree) if p.endswith('.py') and p not in find.bank]
+    if not paths: return 0
+    def fetch(path):
+        try: return path, find.source(path)
+        except Exception as e: LOG.debug(f"[ERR] prefetch failed [{path}] {e}"); return path, None # fetched again on exec
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths)), thread_name_prefix='importpy-prefetch') as pool:
+        done = {p:c for p, c in pool.map(fetch, paths) if c is not None}
+    find.bank.update(done)
+    LOG.debug(f"[INF] prefetched {len(done)}/{len(paths)} sources of [{find.pnme}]")
+    return len(done)
 
 #####################################
 
@@ -166,82 +363,160 @@ class FleMetaFinder(AbstractMetaFinder):
         self.type = 'file://' if not type else type
         self.data = None # archive
         self.as_finder_role = as_finder_role
+        self.kind = {}   # path → isdir, classified while scanning
 
     def imports(self, url, clean=None):
         if not hasfile(url): raise FileNotFoundError(f"[ERR] cannot find path [{url}] ...")
         root = normalized_path(strip_type(url)) # remove file://
-        base = os.path.dirname(root) # if root is a dir, it works as a package, if file as a module 
-        wdir = root if os.path.isdir(root) else os.path.dirname(root) # walk dir
+        ispk = os.path.isdir(root) # if root is a dir, it works as a package, if file as a module 
         self.pnme = strip_dotpy(root.split("/")[-1]) 
-        self.data = [normalized_path(os.path.join(p, py)) for p, _, f in os.walk(wdir) for py in f if py.endswith('.py')] + [normalized_path(p) for p, _, _ in os.walk(wdir)]
-        self.tree = {normalized_dots(os.path.relpath(f, base)):f for f in self.data} # 'pip.__init__' vs 'c:/[FILE_DIR]/pip/__init__.py'
+        self.tree = self.scan(root, self.pnme) if ispk else self.scan(os.path.dirname(root), '') # 'pip.__init__' vs 'c:/[FILE_DIR]/pip/__init__.py'
+        self.data = list(self.tree.values())
         if clean : clean(self.pnme) 
         return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
 
+    def scan(self, wdir, dots) -> dict : # {dotted: path} in one scandir pass, dirs python cannot import skipped, ie, __pycache__ .git my-data
+        tree = {dots: wdir} if dots else {}
+        self.kind[wdir] = True
+        stack = [(wdir, dots)]
+        while stack:
+            dir, dots = stack.pop()
+            try: ents = os.scandir(dir)
+            except OSError as e: LOG.debug(f"[ERR] scandir failed [{dir}] {e}"); continue
+            with ents:
+                for e in ents:
+                    try: isdir = e.is_dir()
+                    except OSError: continue
+                    if isdir and (not e.name.isidentifier() or e.name in manifest.SKIP_DIRS): continue
+                    if not isdir and not e.name.endswith('.py'): continue
+                    path, name = f"{dir}/{e.name}", e.name if isdir else e.name[:-3]
+                    key = f"{dots}.{name}" if dots else name
+                    tree[key], self.kind[path] = path, isdir
+                    if isdir and not e.is_symlink(): stack.append((path, key)) # symlinked dirs listed, never entered, like os.walk
+        return tree
+
     def sourcecode(self, dot_path):
         if not dot_path in self.tree: return ''
-        if os.path.isdir(self.tree[dot_path]): return ''
+        if self.kind.get(self.tree[dot_path], False): return '' # classified while scanning, never stat again
         with open(self.tree[dot_path], 'r', encoding='utf-8') as f: return f.read()
             
     def custom_loader(self, file_path, is_pkg):
         return self.lodr(self.type, self.sourcecode, self.pnme, file_path, is_pkg)
 
 class WebMetaFinder(AbstractMetaFinder) :
-    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True):
+    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True, prefetch=None, crawl=None):
         super().__init__(uselazy)
         self.type = 'web://' if not type else type
         self.data = None # archive
         self.as_finder_role = as_finder_role
         self.inst = http_files # instrumentation
         self.bank = {} 
+        self.prefetch = PREFETCH if prefetch is None else prefetch
+        self.crawl = WEB_CRAWL if crawl is None else crawl
+        self.root = None   # package url
+        self.miss = set()  # dotted names probed and not found, never probed again
+        self.sums = None   # url → sha256 of the server side manifest, None if listed otherwise
 
     def imports(self, url, clean=None) :
         root = url.rstrip("/") 
         base = os.path.dirname(root) # if root is a dir, it works as a package, if file, as a module 
         self.pnme = strip_dotpy(root.split("/")[-1])
-        self.data = self.inst(root, extension='.py')
+        self.root = root
+        http_forget(root); self.miss.clear() # re-import, nothing kept from the previous one
+        self.data = self.listed(root) or (self.inst(root, extension='.py') if self.crawl else self.top(root))
         self.tree = {normalized_dots(os.path.relpath(f, base)):f for f in self.data} # 'pip.__init__' vs 'http://localhost:1080/[ROOT_DIR]/pip/__init__.py'
+        if self.prefetch: prefetch(self, self.prefetch)
         if clean: clean(self.pnme)
         return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
 
+    def listed(self, root) -> list : # tree of the server side manifest in one request, None without one
+        if not manifest.MANIFEST or root.endswith('.py'): return None
+        try:
+            with pools.urlopen(f"{root}/{manifest.MANIFEST}") as req: files = manifest.load(req.read())
+        except (HTTPError, URLError, ValueError) as e: LOG.debug(f"[INF] no manifest [{root}] {e}"); return None
+        kind = manifest.paths(root, files)
+        http_keep({p: {'status': 200, 'dir': d, 'size': None if d else files[p[len(root) + 1:]].get('size'), 'etag': None, 'ranges': False} for p, d in kind.items()}) # never probed
+        self.sums = {f"{root}/{rel}": ent.get('sha256') for rel, ent in files.items()}
+        return list(kind)
+
+    def top(self, root) -> list : # package root and its __init__.py only, the rest is discovered on demand
+        if root.endswith('.py') or not http_exists(f"{root}/__init__.py"):
+            if not http_exists(root): raise FileNotFoundError(f"[ERR] cannot find path [{root}] ...")
+            return [root]
+        return [root, f"{root}/__init__.py"]
+
+    def discover(self, name) -> bool : # probe 'pkg/sub/__init__.py', 'pkg/sub.py', then 'pkg/sub/' as namespace
+        if self.crawl or self.sums is not None or self.root.endswith('.py') or not name.startswith(self.pnme + '.'): return False
+        if name in self.tree or f"{name}.__init__" in self.tree: return True
+        part = name.split('.')
+        if any('.'.join(part[:i]) in self.miss for i in range(2, len(part) + 1)): return False # itself or a parent missed
+        path = f"{self.root}/{'/'.join(part[1:])}"
+        if False: pass
+        elif http_exists(f"{path}/__init__.py"): self.tree.update({name: path, f"{name}.__init__": f"{path}/__init__.py"})
+        elif http_exists(f"{path}.py"): self.tree[name] = f"{path}.py"
+        elif http_exists(path) and http_probe(path)['dir']: self.tree[name] = path # namespace package, listing page
+        else: self.miss.add(name); return False
+        LOG.debug(f"[INF] discovered [{name}] → [{self.tree[name]}]")
+        return True
+
+    def source(self, path) :
+        code = self.inst.source(path)
+        if self.sums: manifest.verify(self.sums.get(path), code, path)
+        return code
+
     def sourcecode(self, dot_path) :
-        if self.inst.isdir(self.tree[dot_path]): return ''
         path = self.tree[dot_path]
-        code = self.bank.get(path)
-        if code: return code
-        self.bank[path] = self.inst.source(path)
+        if HTTP_KIND.get(path, {}).get('dir', not path.endswith('.py')): return '' # classified while crawling, never re-probed
+        if path in self.bank: return self.bank[path]
+        self.bank[path] = self.source(path)
         return self.bank[path]
 
     def custom_loader(self, file_path, is_pkg):
         return self.lodr(self.type, self.sourcecode, self.pnme, file_path, is_pkg)
 
 class FtpMetaFinder(AbstractMetaFinder):
-    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True):
+    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True, prefetch=None):
         super().__init__(uselazy)
         self.type = 'ftp://' if not type else type
         self.data = None # archive
         self.as_finder_role = as_finder_role
-        self._ftp = None
         self.inst = ftp_files # instrumentation
         self.bank = {} 
+        self.prefetch = PREFETCH if prefetch is None else prefetch
+        self.auth = None # (host, port, user, pass) of FTP_POOL sessions
+        self.kind = {}   # path → isdir, classified while crawling
+        self.sums = None # path → sha256 of the server side manifest, None if crawled
 
     def imports(self, url, clean=None) :
         _user, _pass, _host, _port, _path = ftp_info(url)
         root = _path
         base = os.path.dirname(root) # if root is a dir, it works as a package, if file, as a module 
-        self._ftp = ftp_connect(_host, _port, _user, _pass)
-        self.data = self.inst(self._ftp, root, extension='.py')  
+        self.auth = (_host, _port, _user, _pass)
+        self.data = self.listed(root) or self.inst(self.auth, root, extension='.py', kind=self.kind)
         self.pnme = strip_dotpy(root.split("/")[-1]) 
         self.tree = {normalized_dots(os.path.relpath(f, base)):f for f in self.data} # 'pip.__init__' vs '[ROOT_DIR]/pip/__init__.py'
+        if self.prefetch: prefetch(self, self.prefetch)
         if clean: clean(self.pnme)
         return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
 
+    def listed(self, root) -> list : # tree of the server side manifest in one RETR, None without one
+        if not manifest.MANIFEST or root.endswith('.py'): return None
+        try: files = manifest.load(pools.FTP_POOL.retr(self.auth, f"{root}/{manifest.MANIFEST}"))
+        except (error_perm, ValueError) as e: LOG.debug(f"[INF] no manifest [{root}] {e}"); return None
+        self.kind.update(manifest.paths(root, files))
+        self.sums = {f"{root}/{rel}": ent.get('sha256') for rel, ent in files.items()}
+        return [p for p in self.kind if p == root or p.startswith(root + '/')]
+
+    def source(self, path) : # pooled session, safe from any thread
+        code = self.inst.source(self.auth, path)
+        if self.sums: manifest.verify(self.sums.get(path), code, path)
+        return code
+
     def sourcecode(self, dot_path) :
-        if self.inst.isdir(self._ftp, self.tree[dot_path]): return ''
         path = self.tree[dot_path]
-        code = self.bank.get(path)
-        if code: return code
-        self.bank[path] = self.inst.source(self._ftp, path)
+        if self.kind.get(path, not path.endswith('.py')): return '' # classified while crawling, never re-probed
+        if path in self.bank: return self.bank[path]
+        self.bank[path] = self.source(path)
         return self.bank[path]
     
     def custom_loader(self, file_path, is_pkg):
@@ -249,31 +524,200 @@ class FtpMetaFinder(AbstractMetaFinder):
 
 #####################################
 
+class MappedFile(mmap.mmap): # file-like enough for zipfile
+    def seekable(self): return True
+
+class MappedZipFile(zipfile.ZipFile): # zip over a read-only mmap, archive bytes shared with page cache
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try: self.view = MappedFile(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except: self.file.close(); raise
+        super().__init__(self.view)
+
+    def slice(self, name) -> memoryview : # zero-copy for stored members, decompressed copy otherwise
+        info = self.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1: return memoryview(self.read(info))
+        head = self.view[info.header_offset:info.header_offset + zipfile.sizeFileHeader]
+        if len(head) != zipfile.sizeFileHeader or head[:4] != zipfile.stringFileHeader: raise zipfile.BadZipFile(f"[ERR] bad local header [{name}]")
+        nlen, elen = struct.unpack('<HH', head[26:30]) # file name length, extra field length
+        offs = info.header_offset + zipfile.sizeFileHeader + nlen + elen
+        return memoryview(self.view)[offs:offs + info.file_size]
+
+    def close(self):
+        super().close()
+        try: self.view.close()
+        except BufferError: pass # slices still alive, unmapped when collected
+        self.file.close()
+        release(self.path)
+
+class RangeReplaced(zipfile.BadZipFile): pass # If-Range answered 200, the remote file changed since its directory was read
+
+class RangeFile: # read-only remote file for zipfile, bytes fetched with Range requests and kept, whole body if Range is ignored
+    def __init__(self, url: str, size: int, tag: str = None):
+        self.url = url
+        self.size = size
+        self.tag = tag    # ETag or Last-Modified, If-Range guard against a file replaced meanwhile
+        self.pos = 0
+        self.segs = []    # [(start, bytes)...] sorted, disjoint
+        self.full = None  # whole body (mmap or memoryview), once a server without validator answered 200
+        self.lock = threading.Lock()
+        self.requests = 0 # for tests and stats
+        self.fetched = 0
+
+    def seekable(self): return True
+    def tell(self): return self.pos
+    def seek(self, pos, whence=0) :
+        self.pos = pos if whence == 0 else self.pos + pos if whence == 1 else self.size + pos
+        return self.pos
+
+    def read(self, n=-1) -> bytes :
+        stop = self.size if n is None or n < 0 else min(self.pos + n, self.size)
+        data = self.slice(self.pos, stop)
+        self.pos += len(data)
+        return data
+
+    def missing(self, start: int, stop: int) -> list : # [(start, stop)...] not fetched yet
+        gaps = []
+        with self.lock:
+            if self.full is not None: return gaps
+            for s, d in self.segs[max(bisect.bisect_right(self.segs, (start,)) - 1, 0):]:
+                if stop <= s: break
+                if start < s: gaps.append((start, s))
+                start = max(start, s + len(d))
+        if start < stop: gaps.append((start, stop))
+        return gaps
+
+    def load(self, spans) -> int : # fetch spans not kept yet, gaps shorter than RANGE_GAP coalesced into one request
+        gaps = sorted(g for a, b in spans for g in self.missing(max(0, a), min(b, self.size)))
+        runs = []
+        for a, b in gaps:
+            if runs and a - runs[-1][1] <= RANGE_GAP: runs[-1][1] = max(runs[-1][1], b)
+            else: runs.append([a, b])
+        for a, b in runs:
+            if self.full is None: self.fetch(a, b)
+        return len(runs)
+
+    def fetch(self, start: int, stop: int) :
+        head = {'Range': f'bytes={start}-{stop - 1}'}
+        if self.tag: head['If-Range'] = self.tag
+        with trace.span('fetch', self.url, range=f'{start}-{stop - 1}') as rec:
+            with pools.urlopen(self.url, headers=head) as req:
+                self.requests += 1
+                if req.status != 206 and self.tag: raise RangeReplaced(f"[ERR] remote file replaced [{self.url}] If-Range {self.tag} answered {req.status} ...")
+                if req.status != 206: # Range ignored, no validator to tell a replaced file, keep the whole body
+                    LOG.debug(f"[INF] range ignored [{self.url}] status {req.status}, whole body")
+                    body = spool(req, self.url)
+                    data = body.getbuffer() if not isinstance(body, str) else self.mapped(body)
+                    with self.lock: self.full, self.size, self.segs = data, len(data), []
+                    self.fetched += len(data)
+                    if rec is not None: rec['bytes'] = len(data)
+                    return
+                first = int(req.headers.get('Content-Range', f'bytes {start}-').partition(' ')[2].partition('-')[0] or start)
+                data = req.read()
+            self.fetched += len(data)
+            if rec is not None: rec['bytes'] = len(data)
+        with self.lock: # insert, drop segments covered by the new one
+            last = first + len(data)
+            keep = [(s, d) for s, d in self.segs if s + len(d) <= first or last <= s]
+            bisect.insort(keep, (first, data))
+            self.segs = keep
+
+    def mapped(self, path) : # spooled body mapped read-only, file released once mapped
+        with open(path, 'rb') as f: data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        release(path)
+        return data
+
+    def slice(self, start: int, stop: int) -> bytes :
+        if stop <= start: return b''
+        self.load([(start, stop)])
+        with self.lock:
+            if self.full is not None: return bytes(self.full[start:stop])
+            out = []
+            for s, d in self.segs[max(bisect.bisect_right(self.segs, (start,)) - 1, 0):]:
+                if stop <= s: break
+                if s + len(d) <= start: continue
+                out.append(d[max(start - s, 0):stop - s])
+        return b''.join(out)
+
+    def close(self): pass
+
+class RemoteZipFile(zipfile.ZipFile): # central directory read with Range requests, members fetched on demand
+    def __init__(self, url: str, size: int, tag: str = None):
+        self.file = RangeFile(url, size, tag)
+        self.file.load([(size - RANGE_TAIL, size)]) # end of central directory, and the directory itself unless huge
+        super().__init__(self.file)
+        offs = sorted({i.header_offset for i in self.infolist()} | {self.start_dir})
+        self.span = {i.filename: (i.header_offset, offs[bisect.bisect_right(offs, i.header_offset)]) for i in self.infolist()} # local header + data
+
+    def load(self, names) -> int : # requests made for the members
+        return self.file.load([self.span[n] for n in names if n in self.span])
+
+    def slice(self, name) -> memoryview : # one request for local header and data
+        self.load([name])
+        return memoryview(self.read(name))
+
 class ZipMetaFinder(AbstractMetaFinder):
-    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True):
+    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True, usemmap:bool = True, prefetch=None):
         super().__init__(uselazy)
         self.type = 'zip://' if not type else type
         self.data = None # archive
         self.as_finder_role = as_finder_role
         self.inst = None # instrumentation
+        self.url = None
+        self.mmap = usemmap # map local or cached archives instead of holding their bytes
+        self.prefetch = PREFETCH if prefetch is None else prefetch # members fetched together once the directory is read, ranged only
+
+    def remote(self, url) -> RemoteZipFile : # None unless ranged reading pays off, large, not cached yet, Range supported
+        if RANGE_MIN is None or not url.startswith(('http://', 'https://')) or pools.proxied(url): return None
+        if cache.ARTIFACT_CACHE.lookup(url)[0]: return None # cached artifact, mapped and revalidated as usual
+        try: kind = http_probe(url) # refreshed by hasfile() in imports, size and validator of the current file
+        except Exception as e: LOG.debug(f"[ERR] probe failed [{url}] {e}"); return None
+        if not kind.get('ranges') or not kind.get('size') or kind['size'] < RANGE_MIN: return None
+        try: return RemoteZipFile(url, kind['size'], kind.get('etag'))
+        except (OSError, zipfile.BadZipFile, http.client.HTTPException) as e: LOG.debug(f"[ERR] ranged zip failed [{url}] {e}, whole download"); return None
+
+    def archive(self, obj) -> zipfile.ZipFile :
+        if isinstance(obj, zipfile.ZipFile): return obj
+        if self.mmap and isinstance(obj, str):
+            try: arch = MappedZipFile(obj); release(obj); return arch
+            except (OSError, ValueError) as e: LOG.debug(f"[ERR] mmap failed [{obj}] {e}")
+        arch = zipfile.ZipFile(obj)
+        release(obj) # kept open by zipfile
+        return arch
 
     def imports(self, url, clean = None):
         if not hasfile(url): raise FileNotFoundError(f"[ERR] cannot find path [{url}] ...")
-        if not url.endswith('.whl') and not url.endswith('.zip'): return None
-        self.inst = zipfile.ZipFile(fetch2mem(url))
+        if not url.partition('#')[0].endswith(('.whl', '.zip')): return None
+        self.url = url
+        self.inst = self.archive(self.remote(url) or fetch2mem(url))
         name_list = self.inst.namelist() 
         self.data = [p for p in name_list if p.endswith(".py")] + list({os.path.dirname(p) for p in name_list})
         self.tree = {normalized_dots(p):p for p in self.data} 
         self.pnme = sorted(set(p.split("/")[0] for p in self.tree))[0]  # package name
+        if self.prefetch and isinstance(self.inst, RemoteZipFile):
+            try: self.inst.load(self.tree[n] for n in prefetched(self, self.prefetch) if n in self.tree)
+            except RangeReplaced as e: self.refetch(e)
         if clean : clean(self.pnme)
         return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
 
     def sourcecode(self, dot_path) :
         if not dot_path in self.tree: return None
-        return self.inst.read(self.tree[dot_path]).decode()
+        try: data = self.member(self.tree[dot_path])
+        except RangeReplaced as e: self.refetch(e); data = self.member(self.tree[dot_path])
+        with trace.timed(trace.current(), 'decode'): return str(data, 'utf-8') # part of fetch
+
+    def member(self, name) :
+        return self.inst.slice(name) if isinstance(self.inst, (MappedZipFile, RemoteZipFile)) else self.inst.read(name)
+
+    def refetch(self, err) : # ranged archive replaced on the server, whole download of the new one
+        LOG.warning(f"{err}, whole download")
+        self.inst = self.archive(fetch2mem(self.url))
 
     def custom_loader(self, file_path, is_pkg):
-        return self.lodr(self.type, self.sourcecode, self.pnme, file_path, is_pkg)
+        load = self.lodr(self.type, self.sourcecode, self.pnme, file_path, is_pkg)
+        load.archive = self.inst # for CustomResourceFinder
+        return load
 
 class TgzMetaFinder(AbstractMetaFinder) :
     def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True) :
@@ -282,56 +726,144 @@ class TgzMetaFinder(AbstractMetaFinder) :
         self.data = None # archive
         self.as_finder_role = as_finder_role
         self.inst = None # instrumentation
+        self.file = None # uncompressed tar
+        self.view = None # mmap of self.file
     
     def imports(self, url, clean = None) :
         if not hasfile(url): raise FileNotFoundError(f"[ERR] cannot find path [{url}] ...")
-        if not url.endswith('.tar.gz') and not url.endswith('.tgz'): return None
+        if not url.partition('#')[0].endswith(('.tar.gz', '.tgz')): return None
         obj = fetch2mem(url)
-        self.inst = tarfile.open(name=obj if type(obj) == str else None, fileobj=None if type(obj) == str else obj, mode="r:gz")
-        self.save = {sep[1]:self.inst.extractfile(m).read().decode("utf-8")  # package tree, must always start with the package name
+        self.file = self.unpack(obj) # uncompressed tar, random access
+        release(obj)
+        self.view = MappedFile(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.inst = tarfile.open(fileobj=self.view, mode="r:")
+        self.save = {sep[1]:m  # package tree, must always start with the package name, member index only, read on demand
                      for m in self.inst.getmembers() if m.isfile() and m.name.endswith(".py") and len((sep := m.name.split("src/"))) == 2}
         self.data = [p for p in self.save if p.endswith(".py")] + list({os.path.dirname(p) for p in self.save})
-        self.tree = {normalized_dots(p):(self.save.get(p, '')) for p in self.data} 
+        self.tree = {normalized_dots(p):p for p in self.data} 
         self.pnme = sorted(set(path.split("/")[0] for path in self.tree))[0] # package name
         if clean : clean(self.pnme)
         return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
 
+    def unpack(self, obj) : # gunzip once into the tar cache (temp file if disabled), keyed by archive identity
+        def gunzip(f):
+            with gzip.open(obj) as gz: shutil.copyfileobj(gz, f, 1 << 20)
+        if cache.TAR_CACHE.base: # never hash a whole in-memory archive for a disabled cache
+            if isinstance(obj, str): stat = os.stat(obj); hash = hashlib.sha256(f"{os.path.abspath(obj)}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+            else: hash = hashlib.sha256(obj.getbuffer())
+            path = cache.TAR_CACHE.produce(hash.hexdigest(), gunzip)
+            if path: return open(path, 'rb')
+        temp = tempfile.TemporaryFile()
+        gunzip(temp)
+        temp.flush()
+        return temp
+
     def sourcecode(self, dot_path) :
         if not dot_path in self.tree: return None
-        return self.tree[dot_path]
+        info = self.save.get(self.tree[dot_path])
+        if not info: return '' # package dir
+        data = self.inst.extractfile(info).read() if info.sparse is not None else memoryview(self.view)[info.offset_data:info.offset_data + info.size]
+        with trace.timed(trace.current(), 'decode'): return str(data, "utf-8") # part of fetch
 
     def custom_loader(self, file_path, is_pkg) :
         return self.lodr(self.type, self.sourcecode, self.pnme, file_path, is_pkg)
 
+GIT_API = 'https://api.github.com' # commits and zipball endpoints of GitMetaFinder
+GIT_ARCHIVE = True                  # default of GitMetaFinder, True one zipball per commit, False one raw request per file
+GIT_SHA_RE = re.compile(r"^[0-9a-fA-F]{40}$")
+
 class GitMetaFinder(AbstractMetaFinder):
-    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True):
+    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True, prefetch=None, archive=None, api:str = None):
         super().__init__(uselazy)
         self.type = 'git://' if not type else type
         self.data = None # archive
         self.as_finder_role = as_finder_role
         self.bank = {}
+        self.prefetch = PREFETCH if prefetch is None else prefetch
+        self.archive = GIT_ARCHIVE if archive is None else archive
+        self.api = (api or GIT_API).rstrip('/')
+        self.inst = None # zipball of the commit, archive mode
+        self.sha = None  # commit of the ref, resolved once per import
 
     def imports(self, url, clean = None):
         part = url.rstrip("/").split("/") # ex, https://github.com/pypa/pip/tree/main/src/pip, part[3]==pypa, part[4]=pip, part[6]=main
         root = "/".join(part[7:]) # src/pip
-        base = f"https://raw.githubusercontent.com/{part[3]}/{part[4]}/{part[6]}" # raw web url
-        self.json = json.loads(urllib.request.urlopen(f"https://api.github.com/repos/{part[3]}/{part[4]}/git/trees/{part[6]}?recursive=1").read().decode())
-        self.save = {path.replace('src/', ''):f"{base}/{path}" # package tree, must always start with the package name
-                     for item in self.json.get('tree', []) if (path := item.get('path', '')).startswith(root + '/') and path.endswith('.py')}
+        if self.archive: self.save = self.zipball(part[3], part[4], part[6], root)
+        else:
+            base = f"https://raw.githubusercontent.com/{part[3]}/{part[4]}/{part[6]}" # raw web url
+            self.json = json.loads(pools.urlopen(f"{self.api}/repos/{part[3]}/{part[4]}/git/trees/{part[6]}?recursive=1").read().decode())
+            self.save = {path.replace('src/', ''):f"{base}/{path}" # package tree, must always start with the package name
+                         for item in self.json.get('tree', []) if (path := item.get('path', '')).startswith(root + '/') and path.endswith('.py')}
         self.data = [p for p in self.save if p.endswith(".py")] + list({os.path.dirname(p) for p in self.save})
         self.tree = {normalized_dots(p):(self.save.get(p, '')) for p in self.data} 
         self.pnme = root.split("/")[-1]                        # package name
+        if self.prefetch and not self.archive: prefetch(self, self.prefetch)
         if clean : clean(self.pnme)
         return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
 
+    def zipball(self, owner, repo, ref, root) -> dict : # package tree of the commit archive, a pinned commit cached for good
+        if GIT_SHA_RE.match(ref): self.sha = ref.lower()
+        else:
+            with pools.urlopen(f"{self.api}/repos/{owner}/{repo}/commits/{ref}", headers={'Accept': 'application/vnd.github.sha'}) as req: self.sha = req.read().decode().strip()
+            if not GIT_SHA_RE.match(self.sha): raise ValueError(f"[ERR] cannot resolve [{owner}/{repo}@{ref}] got [{self.sha[:64]}] ...")
+        url = f"{self.api}/repos/{owner}/{repo}/zipball/{self.sha}#commit={self.sha}" # immutable, artifact cache keyed by commit
+        obj = fetch2mem(url)
+        if obj is None: raise URLError(f"[ERR] cannot download [{url}] ...")
+        self.inst = ZipMetaFinder(as_finder_role=False).archive(obj)
+        names = self.inst.namelist()
+        top = names[0].partition('/')[0] if names else '' # ex, pypa-pip-1a2b3c4/
+        parent = root.rpartition('/')[0] # package tree, must always start with the package name
+        skip = len(top) + 1 + (len(parent) + 1 if parent else 0)
+        return {n[skip:]:n for n in names if n.startswith(f"{top}/{root}/") and n.endswith('.py')}
+
+    def source(self, path) :
+        if self.inst is None: return pools.urlopen(path).read().decode()
+        data = self.inst.slice(path) if isinstance(self.inst, MappedZipFile) else self.inst.read(path)
+        with trace.timed(trace.current(), 'decode'): return str(data, 'utf-8') # part of fetch
+
     def sourcecode(self, dot_path) :
         if not dot_path in self.tree: return None
-        path = self.tree[dot_path] # ex, 'pip.__init__' to 'https://raw.githubusercontent.com/pypa/pip/main/src/pip/__init__.py'
-        code = self.bank.get(path)
-        if code: return code
-        self.bank[path] = urllib.request.urlopen(path).read().decode()
+        path = self.tree[dot_path] # ex, 'pip.__init__' to 'https://raw.githubusercontent.com/pypa/pip/main/src/pip/__init__.py' or its zipball member
+        if not path: return '' # package dir
+        if path in self.bank: return self.bank[path] # prefetched, archive members too
+        if self.inst is not None: return self.source(path) # random access, nothing to keep
+        self.bank[path] = self.source(path)
         return self.bank[path]
 
     def custom_loader(self, file_path, is_pkg) :
         return self.lodr(self.type, self.sourcecode, self.pnme, file_path, is_pkg)
 
+#####################################
+
+class BundleLoader(protocol.DefaultLoader): # code objects unmarshalled from the bundle, nothing to compile
+    def compile(self, rec):
+        if not self.archive.fresh: return super().compile(rec) # other interpreter, bundled source through the code cache
+        trace.note(cache='ipyb')
+        with trace.timed(rec, 'compile'): return self.archive.code(self.path) # unmarshal
+
+class BundleMetaFinder(AbstractMetaFinder): # precompiled single file bundle, see protocol_bundle.py
+    def __init__(self, type:str = None, uselazy:bool = True, as_finder_role:bool = True):
+        super().__init__(uselazy)
+        self.type = 'ipyb://' if not type else type
+        self.data = None # archive
+        self.as_finder_role = as_finder_role
+        self.inst = None # bundle
+        self.lodr = BundleLoader
+
+    def imports(self, url, clean = None) :
+        if not hasfile(url): raise FileNotFoundError(f"[ERR] cannot find path [{url}] ...")
+        obj = fetch2mem(url)
+        self.inst = bundle.Bundle(obj) # mapped
+        release(obj)
+        self.tree = self.inst.tree() # index only, no member listing or path normalizing
+        self.pnme = self.inst.index['pnme']
+        if clean : clean(self.pnme)
+        return self.pnme if not self.as_finder_role else importlib.import_module(self.pnme)
+
+    def sourcecode(self, dot_path) :
+        return self.inst.source(dot_path)
+
+    def custom_loader(self, file_path, is_pkg) :
+        load = self.lodr(self.type, self.inst.source, self.pnme, file_path, is_pkg)
+        load.archive = self.inst # for CustomResourceFinder
+        return load
@@ -0,0 +1,71 @@
+import os, sys, json, hashlib, posixpath
+
+import logging
+LOG = logging.getLogger(__name__)
+
+##################################### manifest, one request lists a whole http/ftp package
+# importpy-index.json placed in the package directory, paths relative to it
+# {'format': 1, 'name': 'pkg', 'files': [{'path': 'sub/mod.py', 'size': 123, 'sha256': '...'}, ...]}
+
+MANIFEST = 'importpy-index.json' # None → never looked up, discovered by listing as before
+MANIFEST_FORMAT = 1
+SKIP_DIRS = ('__pycache__', 'node_modules') # and every dot directory, ie, .git .venv
+
+def build(root: str) -> dict : # manifest of the .py files below root
+    files = []
+    for dir, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS)
+        for name in sorted(names):
+            if not name.endswith('.py'): continue
+            path = os.path.join(dir, name)
+            with open(path, 'rb') as f: data = f.read()
+            files.append({'path': os.path.relpath(path, root).replace('\\', '/'), 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()})
+    return {'format': MANIFEST_FORMAT, 'name': os.path.basename(os.path.abspath(root)), 'files': files}
+
+def write(root: str, out: str = None) -> str :
+    path = out or os.path.join(root, MANIFEST)
+    with open(path, 'w', encoding='utf-8') as f: json.dump(build(root), f, indent=1)
+    return path
+
+def load(data) -> dict : # {relative path: entry} of a manifest, ValueError if malformed
+    try: meta = json.loads(data)
+    except ValueError as e: raise ValueError(f"[ERR] broken manifest {e}")
+    if not isinstance(meta, dict) or meta.get('format') != MANIFEST_FORMAT: raise ValueError(f"[ERR] unsupported manifest format [{meta.get('format') if isinstance(meta, dict) else meta}] ...")
+    if not isinstance(meta.get('files', []), list): raise ValueError(f"[ERR] manifest files must be a list ...")
+    files = {}
+    for ent in meta.get('files', []):
+        if not isinstance(ent, dict) or not isinstance(ent.get('path'), str) or not ent['path']: raise ValueError(f"[ERR] broken manifest entry [{ent}] ...")
+        rel = posixpath.normpath(ent['path'])
+        if rel.startswith(('/', '../')) or rel == '..': raise ValueError(f"[ERR] manifest path outside of the package [{ent['path']}] ...")
+        if not rel.endswith('.py'): raise ValueError(f"[ERR] manifest lists a non .py path [{ent['path']}] ...")
+        files[rel] = ent
+    return files
+
+def paths(root: str, files: dict) -> dict : # {path: isdir} of root, the listed files and every directory between
+    kind = {root: True}
+    for rel in files:
+        part = rel.split('/')
+        for i in range(1, len(part)): kind[f"{root}/{'/'.join(part[:i])}"] = True
+        kind[f"{root}/{rel}"] = False
+    return kind
+
+def verify(want: str, text, path: str) :
+    if not want: return
+    got = hashlib.sha256(text.encode('utf-8') if isinstance(text, str) else text).hexdigest()
+    if want != got: raise ValueError(f"[ERR] sha256 mismatch [{path}] manifest {want} but got {got} ...")
+
+##################################### command line, python -m importpy.protocol_manifest DIR...
+
+def main(argv=None) -> int :
+    import argparse
+    pars = argparse.ArgumentParser(prog='python -m importpy.protocol_manifest', description=f'write {MANIFEST} into package directories served over http/ftp')
+    pars.add_argument('dirs', nargs='+', help='package directory, ie, ./www/pkg')
+    args = pars.parse_args(argv)
+    for dir in args.dirs:
+        if not os.path.isdir(dir): print(f"[ERR] not a directory [{dir}]"); return 1
+        path = write(dir)
+        print(f"[INF] indexed [{dir}] → [{path}]")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
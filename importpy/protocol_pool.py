@@ -0,0 +1,239 @@
+import io, ssl, time, threading, ftplib
+import http.client, urllib.request, urllib.parse
+from urllib.error import URLError, HTTPError
+
+import logging
+LOG = logging.getLogger(__name__)
+
+#####################################
+
+HTTP_MAX_CONNS = 8    # per host, soft limit
+HTTP_IDLE = 30.0      # seconds a kept-alive connection may idle in the pool
+HTTP_RETRY = 1        # retries of idempotent requests on a stale kept-alive connection, on a fresh one
+HTTP_WAIT = 30.0      # seconds to wait for a free connection before exceeding the limit
+HTTP_TIMEOUT = 60.0
+HTTP_DRAIN = 64 * 1024 # unread body drained on close to keep the connection, dropped if larger
+HTTP_REDIRECTS = 8
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": "identity"}
+
+class PooledResponse:
+    def __init__(self, pool, key, conn, resp, url):
+        self.pool = pool
+        self.key = key
+        self.conn = conn
+        self.resp = resp
+        self.url = url
+        self.status = self.code = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def read(self, amt=None) -> bytes :
+        data = self.resp.read() if amt is None else self.resp.read(amt)
+        if self.resp.isclosed(): self.release()
+        return data
+
+    def geturl(self) -> str : return self.url
+    def info(self): return self.headers
+    def getheader(self, name, default=None): return self.headers.get(name, default)
+
+    def release(self) : # back to the pool once the body is consumed
+        if self.conn is None: return
+        conn, self.conn = self.conn, None
+        self.pool.release(self.key, conn, reuse=self.resp.isclosed() and not self.resp.will_close)
+
+    def close(self) :
+        if self.conn is None: return
+        try:
+            if not self.resp.isclosed(): self.resp.read(HTTP_DRAIN)
+        except (OSError, http.client.HTTPException): pass
+        if not self.resp.isclosed(): self.resp.close()
+        self.release()
+
+    def __enter__(self): return self
+    def __exit__(self, *args): self.close()
+    def __del__(self): # finalizer never blocks on the network, an unread body drops the socket
+        if self.conn is None: return
+        done = self.resp.isclosed()
+        if not done: self.resp.close()
+        conn, self.conn = self.conn, None
+        self.pool.release(self.key, conn, reuse=done and not self.resp.will_close)
+
+class HTTPPool: # per host kept-alive http.client connections shared by every http finder
+    def __init__(self, maxconns: int = None, idle: float = None, retry: int = None):
+        self.maxconns = maxconns # None → module default on every access
+        self.idle = idle
+        self.retry = retry
+        self.free = {}  # (scheme, host, port) → [(conn, released)...]
+        self.live = {}  # (scheme, host, port) → live connection count
+        self.cond = threading.Condition()
+        self.made = 0   # connections opened, for tests and stats
+        self.ssl = None # one context per pool, CA store loaded once
+
+    def context(self) -> ssl.SSLContext : # lazily through urllib's hook, honors ssl._create_default_https_context overrides
+        if self.ssl is None: self.ssl = ssl._create_default_https_context()
+        return self.ssl
+
+    def acquire(self, key, timeout, fresh=False) : # (conn, reused), fresh never takes a kept-alive one
+        till = time.monotonic() + HTTP_WAIT
+        with self.cond:
+            while True:
+                free = self.free.get(key) if not fresh else None
+                while free:
+                    conn, when = free.pop()
+                    if (self.idle or HTTP_IDLE) <= time.monotonic() - when: conn.close(); self.live[key] -= 1; continue
+                    conn.timeout = timeout
+                    if conn.sock: conn.sock.settimeout(timeout)
+                    return conn, True
+                if self.live.get(key, 0) < (self.maxconns or HTTP_MAX_CONNS) or till < time.monotonic(): break
+                self.cond.wait(till - time.monotonic())
+            self.live[key] = self.live.get(key, 0) + 1
+            self.made += 1
+        scheme, host, port = key
+        if scheme == 'https': return http.client.HTTPSConnection(host, port, timeout=timeout, context=self.context()), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def release(self, key, conn, reuse=True) :
+        with self.cond:
+            if reuse: self.free.setdefault(key, []).append((conn, time.monotonic()))
+            else: conn.close(); self.live[key] -= 1
+            self.cond.notify()
+
+    def clear(self) :
+        with self.cond:
+            for key, free in self.free.items():
+                for conn, _ in free: conn.close(); self.live[key] -= 1
+            self.free.clear()
+
+    def send(self, key, method, path, data, head, timeout) : # idempotent requests retried on a fresh connection when a reused one turns out stale
+        for retry in range((self.retry if self.retry is not None else HTTP_RETRY) + 1):
+            conn, reused = self.acquire(key, timeout, fresh=0 < retry)
+            try:
+                conn.request(method, path, body=data, headers=head)
+                return conn, conn.getresponse()
+            except (ConnectionError, http.client.BadStatusLine) as e: # stale kept-alive connection closed by peer
+                self.release(key, conn, reuse=False)
+                if not reused or method not in ('GET', 'HEAD'): raise URLError(e)
+                LOG.debug(f"[INF] stale connection {key} retry[{retry}] {e}")
+            except (OSError, http.client.HTTPException) as e:
+                self.release(key, conn, reuse=False)
+                raise URLError(e)
+        raise URLError(f"[ERR] stale connection retry exhausted {key}")
+
+    def urlopen(self, url, data=None, timeout=None, headers=None, method=None, follow=True) : # follow=False returns redirects as they are
+        if isinstance(url, urllib.request.Request): headers, method, data, url = dict(url.header_items()), url.get_method(), url.data, url.full_url
+        head = dict(HTTP_HEADERS, **(headers or {}))
+        method = method or ('POST' if data is not None else 'GET')
+        timeout = timeout or HTTP_TIMEOUT
+        if proxied(url): return urllib.request.urlopen(urllib.request.Request(url, data=data, headers=head, method=method), timeout=timeout)
+        for _ in range(HTTP_REDIRECTS + 1):
+            part = urllib.parse.urlsplit(url)
+            key = (part.scheme, part.hostname, part.port or (443 if part.scheme == 'https' else 80))
+            conn, resp = self.send(key, method, (part.path or '/') + (f'?{part.query}' if part.query else ''), data, head, timeout)
+            wrap = PooledResponse(self, key, conn, resp, url)
+            if resp.status in (301, 302, 303, 307, 308) and resp.headers.get('Location'):
+                if not follow: return wrap
+                wrap.close()
+                url = urllib.parse.urljoin(url, resp.headers['Location'])
+                if resp.status == 303 or (resp.status in (301, 302) and method == 'POST'): method, data = 'GET', None
+                continue
+            if 300 <= resp.status: raise HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(wrap.read()))
+            return wrap
+        raise HTTPError(url, resp.status, f"[ERR] too many redirects", resp.headers, None)
+
+def proxied(url: str) -> bool : # proxies are left to urllib
+    part = urllib.parse.urlsplit(url)
+    return part.scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(part.hostname or '')
+
+HTTP_POOL = HTTPPool()
+def urlopen(url, data=None, timeout=None, headers=None, method=None, follow=True) -> PooledResponse :
+    return HTTP_POOL.urlopen(url, data=data, timeout=timeout, headers=headers, method=method, follow=follow)
+
+#####################################
+
+FTP_MAX_CONNS = 4     # per host/user, ftp servers usually cap logins per client
+FTP_IDLE = 60.0       # seconds a logged in session may idle in the pool
+FTP_CHECK = 10.0      # sessions idle longer than this are checked with NOOP before reuse
+FTP_TIMEOUT = 60.0
+FTP_WAIT = 60.0       # seconds to wait for a free session before exceeding the limit
+FTP_BROKEN = (EOFError, OSError, ftplib.error_temp, ftplib.error_reply) # session unusable, reconnect
+
+def ftp_login(host, port='21', usr='', pwd='', timeout=None) -> ftplib.FTP :
+    _ftp = ftplib.FTP(timeout=timeout)
+    _ftp.connect(host, int(port) if port else 21)
+    _ftp.login(user=usr if usr else 'anonymouse', passwd= pwd if pwd else 'password@')
+    return _ftp
+
+class FTPPool: # logged in sessions keyed by (host, port, user, pass), operations never rely on cwd
+    def __init__(self, maxconns: int = None):
+        self.maxconns = maxconns # None → module default on every access
+        self.free = {}  # auth → [(ftp, released)...]
+        self.live = {}  # auth → live session count
+        self.cond = threading.Condition()
+        self.made = 0   # logins, for tests and stats
+
+    def acquire(self, auth, timeout: float = None) : # (ftp, reused), network round trips never under the lock
+        till = time.monotonic() + (timeout or FTP_WAIT)
+        while True:
+            ftp = None
+            with self.cond:
+                while True:
+                    free = self.free.get(auth)
+                    if free: ftp, when = free.pop(); break
+                    if self.live.get(auth, 0) < (self.maxconns or FTP_MAX_CONNS) or till < time.monotonic():
+                        self.live[auth] = self.live.get(auth, 0) + 1
+                        self.made += 1
+                        break
+                    self.cond.wait(till - time.monotonic())
+            if ftp is None: break
+            idle = time.monotonic() - when
+            if idle < FTP_IDLE and (idle < FTP_CHECK or alive(ftp)): return ftp, True
+            self.release(auth, ftp, reuse=False) # expired or dead, closed outside of the lock
+        try: return ftp_login(*auth, timeout=FTP_TIMEOUT), False
+        except: self.release(auth, None, reuse=False); raise
+
+    def release(self, auth, ftp, reuse=True) :
+        if not reuse: close(ftp) # QUIT round trip outside of the lock
+        with self.cond:
+            if reuse: self.free.setdefault(auth, []).append((ftp, time.monotonic()))
+            else: self.live[auth] -= 1
+            self.cond.notify()
+
+    def clear(self) :
+        with self.cond:
+            for auth, free in self.free.items():
+                for ftp, _ in free: close(ftp); self.live[auth] -= 1
+            self.free.clear()
+
+    def call(self, auth, func, timeout: float = None) : # func(ftp) on a pooled session, retried while reused sessions turn out broken
+        while True:
+            ftp, reused = self.acquire(auth, timeout)
+            try: data = func(ftp)
+            except FTP_BROKEN as e:
+                self.release(auth, ftp, reuse=False)
+                if not reused: raise
+                LOG.debug(f"[INF] broken ftp session {auth[:2]} reconnect {e}")
+                continue
+            except: self.release(auth, ftp); raise
+            self.release(auth, ftp)
+            return data
+
+    def retr(self, auth, path: str) -> bytes :
+        def retr(ftp):
+            mem = io.BytesIO()
+            ftp.retrbinary(f"RETR {path}", mem.write)
+            return mem.getvalue()
+        return self.call(auth, retr)
+
+    def mlsd(self, auth, path: str) -> list :
+        return self.call(auth, lambda ftp: list(ftp.mlsd(path)))
+
+def alive(ftp) -> bool :
+    try: ftp.voidcmd('NOOP'); return True
+    except: return False
+
+def close(ftp) :
+    if ftp is None: return
+    try: ftp.quit()
+    except: ftp.close()
+
+FTP_POOL = FTPPool()
@@ -0,0 +1,165 @@
+import os, sys, json, time, itertools, threading, contextlib
+
+import logging
+LOG = logging.getLogger(__name__)
+
+##################################### instrumentation, free while no hook is installed
+
+HOOKS = []                 # hook(record: dict), called when a module exec or a fetch ends
+STACK = threading.local()  # records in progress of the current thread, innermost last
+SERIAL = itertools.count(1)
+clock = time.perf_counter
+
+def add_hook(hook) :
+    HOOKS.append(hook)
+    return hook
+
+def remove_hook(hook) :
+    try: HOOKS.remove(hook)
+    except ValueError: pass
+
+def emit(record: dict) :
+    for hook in list(HOOKS):
+        try: hook(record)
+        except Exception as e: LOG.debug(f"[ERR] trace hook failed {hook} {e}")
+
+def current() -> dict : # innermost record of this thread, None outside or while not tracing
+    stack = getattr(STACK, 'items', None)
+    return stack[-1] if stack else None
+
+def note(**fields) : # annotate the innermost record, ie, cache='hit'
+    stack = getattr(STACK, 'items', None)
+    if stack: stack[-1].update(fields)
+
+@contextlib.contextmanager
+def span(kind: str, name: str, **fields) : # record of kind 'module' or 'fetch', nested by the import stack of this thread
+    if not HOOKS: yield None; return
+    stack = STACK.__dict__.setdefault('items', [])
+    rec = dict(kind=kind, name=name, id=next(SERIAL), parent=stack[-1]['id'] if stack else None, depth=len(stack), thread=threading.get_ident(), start=time.time(), **fields)
+    stack.append(rec)
+    tick = clock()
+    try: yield rec
+    except BaseException as e: rec['error'] = repr(e); raise
+    finally:
+        rec['total'] = clock() - tick
+        stack.pop()
+        emit(rec)
+
+@contextlib.contextmanager
+def timed(rec: dict, field: str) : # accumulate seconds into rec[field], no-op without record
+    if rec is None: yield; return
+    tick = clock()
+    try: yield
+    finally: rec[field] = rec.get(field, 0.0) + clock() - tick
+
+#####################################
+
+class Profiler: # collecting hook, importtime style tree report and json export
+    FIELDS = ('fetch', 'decode', 'compile', 'exec')
+
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def __call__(self, record: dict) :
+        with self.lock: self.records.append(dict(record))
+
+    def __enter__(self): add_hook(self); return self
+    def __exit__(self, *args): remove_hook(self)
+    def start(self): return self.__enter__()
+    def stop(self): self.__exit__()
+
+    def tree(self) -> list : # [(depth, record, children total)...] in import order, children under their parent
+        with self.lock:
+            recs = sorted(self.records, key=lambda r: r['id'])
+            kids = {}
+            for r in recs: kids.setdefault(r['parent'], []).append(r)
+            known = {r['id'] for r in recs}
+            rows = []
+            def walk(r, depth):
+                rows.append((depth, r, sum(k['total'] for k in kids.get(r['id'], []))))
+                for k in kids.get(r['id'], []): walk(k, depth + 1)
+            for r in recs:
+                if r['parent'] is None or r['parent'] not in known: walk(r, 0)
+        return rows
+
+    def report(self, file=None) -> str : # like python -X importtime, self/cumulative in microseconds, one column per FIELDS
+        cols = ''.join(f" | {f:>8}" for f in self.FIELDS)
+        rows = [f"import time: {'self [us]':>10} | {'cumulative':>10}{cols} | {'bytes':>9} | {'cache':>5} | {'lazy':>4} | imported package"]
+        for depth, r, kids in self.tree():
+            cols = ''.join(f" | {int(r.get(f, 0) * 1e6):>8}" for f in self.FIELDS)
+            name = r['name'] if r['kind'] == 'module' else f"[{r['kind']}] {r['name']}"
+            rows.append(f"import time: {int((r['total'] - kids) * 1e6):>10} | {int(r['total'] * 1e6):>10}{cols} | {r.get('bytes', 0):>9} | {str(r.get('cache') or '-'):>5} | {'lazy' if r.get('lazy') else '':>4} | {'  ' * depth}{name}")
+        text = '\n'.join(rows)
+        if file: print(text, file=file)
+        return text
+
+    def json(self, path: str = None) -> str :
+        with self.lock: text = json.dumps(sorted(self.records, key=lambda r: r['id']), indent=1, default=str)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f: f.write(text)
+        return text
+
+##################################### progress, the old exec spinner as a hook
+
+# https://www.unicode.org/emoji/charts/emoji-ordering.html
+ROTTXT1 = ['⬆','↗','➡','↘','⬇','↙','⬅','↖']
+ROTTXT2 = ['🌑','🌘','🌗','🌖','🌕','🌔','🌒','🌒']
+ROTTXT3 = ['🕛','🕐','🕑','🕒','🕓','🕔','🕕','🕖','🕗','🕘','🕙','🕚']
+L_RESET = '\033[2K\r'
+PROGRESS_ENV = 'IMPORTPY_PROGRESS' # 1 forces the progress line, 0 disables it, unset → only on an interactive terminal
+PROGRESS_INTERVAL = 0.1            # seconds between redraws
+
+class Progress: # single status line, redrawn at most every interval, never blocks the import on a pipe
+    def __init__(self, stream=None, interval: float = None, rotation=ROTTXT2):
+        self.stream = stream or sys.stderr
+        self.interval = PROGRESS_INTERVAL if interval is None else interval
+        self.rotation = rotation
+        self.count = 0
+        self.last = float('-inf')
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def __call__(self, record: dict) :
+        if record['kind'] not in ('import', 'module'): return
+        if record['kind'] == 'module':
+            with self.lock: self.count += 1
+        if record['parent'] is None: return self.clear() # outermost import or exec done, ie, a lazily imported submodule, nothing left running
+        if record['kind'] != 'module': return
+        now = clock()
+        with self.lock:
+            if now - self.last < self.interval: return
+            self.last = now
+            self.write(f"{L_RESET} {self.rotation[self.count % len(self.rotation)]} exec [{record.get('file') or record['name']}] ...\r")
+
+    def clear(self) :
+        with self.lock:
+            if self.dirty: self.write(L_RESET); self.dirty = False
+
+    def write(self, text: str) :
+        try:
+            self.stream.write(text)
+            self.stream.flush()
+            self.dirty = text != L_RESET
+        except (OSError, ValueError): pass
+
+def interactive(stream=None) -> bool :
+    try: return (stream or sys.stderr).isatty()
+    except (AttributeError, ValueError): return False
+
+PROGRESS = None
+def progress(enable: bool = None, stream=None) -> Progress : # install/remove the progress hook, None → decided by environ and tty
+    global PROGRESS
+    if enable is None:
+        env = os.environ.get(PROGRESS_ENV, '')
+        enable = env not in ('0', 'false', 'off') and (env in ('1', 'true', 'on') or interactive(stream))
+    if PROGRESS: remove_hook(PROGRESS); PROGRESS = None
+    if enable: PROGRESS = add_hook(Progress(stream))
+    return PROGRESS
+
+@contextlib.contextmanager
+def profile(report=None) : # with profile() as prof: ..., tree report written to report (ie, sys.stderr) on exit
+    prof = Profiler()
+    with prof:
+        yield prof
+    if report: prof.report(file=report)
@@ -0,0 +1,152 @@
+# run command >> python ./importpy/tests/bench_importpy.py [--sizes 10 100 1000] [--kinds file http ftp whl sdist] [--out bench.json] [--compare baseline.json]
+# every remote source is served by the local stand-ins of test_importpy.py, nothing leaves 127.0.0.1
+
+import os, sys, json, time, timeit, shutil, tarfile, zipfile, argparse, platform, statistics, subprocess, tempfile
+sys.path.append(os.path.abspath(__file__+ '/../../..'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from pathlib import Path
+
+KINDS = ('file', 'http', 'ftp', 'whl', 'sdist')
+SIZES = (10, 100, 1000)
+REGRESSION = 1.2 # ratio against the baseline reported as regression
+
+######################################## fixtures
+
+def make_sized(root, pack: str, size: int) -> Path : # about size modules, packages of 10 modules
+    def module(path, i):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f'"""bench module {i}"""\nVALUE = {i}\ndef ping(): return \'pong{i}\'\n')
+    module(root / pack / '__init__.py', 0)
+    if size <= 10:
+        for i in range(1, size): module(root / pack / f'mod{i}.py', i)
+    else:
+        for s in range(size // 10):
+            module(root / pack / f'sub{s:03d}' / '__init__.py', s)
+            for i in range(1, 10): module(root / pack / f'sub{s:03d}' / f'mod{i}.py', i)
+    return root / pack
+
+def make_wheel(tree: Path, path: Path) -> Path :
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for f in sorted(tree.rglob('*.py')): z.write(f, f.relative_to(tree.parent).as_posix())
+        z.writestr(f'{tree.name}-1.0.dist-info/METADATA', f"Name: {tree.name}\nVersion: 1.0\n")
+    return path
+
+def make_sdist(tree: Path, path: Path) -> Path :
+    with tarfile.open(path, 'w:gz') as t: t.add(tree, arcname=f'{tree.name}-1.0/src/{tree.name}')
+    return path
+
+def peak_rss() -> int : # bytes, None where resource is missing (windows)
+    try: import resource
+    except ImportError: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+######################################## child, one import in a fresh interpreter
+
+def child(url: str) -> dict :
+    import importlib
+    from importpy import loader as importpy
+    from importpy.protocol import RemoteMetaImporter
+    base = peak_rss()
+    tick = time.perf_counter()
+    modl = importpy(url, uselazy=False)
+    find = RemoteMetaImporter.getInstance().bank[modl.__name__]
+    names = sorted({n[:-9] if n.endswith('.__init__') else n for n, p in find.tree.items() if str(p).endswith('.py')})
+    for n in names: importlib.import_module(n) # every module executed
+    return {'seconds': time.perf_counter() - tick, 'modules': len(names), 'rss': peak_rss(), 'rss_base': base}
+
+def spawn(url: str, cache: Path) -> dict :
+    env = dict(os.environ, IMPORTPY_CACHE=cache.as_posix(), IMPORTPY_PROGRESS='0')
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', url], env=env, capture_output=True, text=True, timeout=900)
+    if proc.returncode: raise RuntimeError(f"[ERR] bench child failed [{url}]\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+######################################## parent
+
+def overhead(root: Path, number: int = 2000) -> dict : # per call cost of _imports, microseconds
+    from importpy import loader as importpy
+    path = make_sized(root, 'overpkg', 2) / 'mod1.py'
+    importpy(str(path))
+    measure = lambda call: min(timeit.repeat(call, number=number, repeat=5)) / number * 1e6
+    return {
+        'local_isolate': measure(lambda: importpy(str(path))),
+        'local_shared': measure(lambda: importpy(str(path), isolate=False)),
+        'local_attr': measure(lambda: importpy(str(path), 'ping')),
+        'remote_shared': measure(lambda: importpy('file://' + path.as_posix(), isolate=False)),
+    }
+
+def run(sizes=SIZES, kinds=KINDS, work: Path = None, repeat: int = 1) -> dict :
+    from test_importpy import http_server, ftp_server
+    work = Path(work or tempfile.mkdtemp(prefix='importpy-bench-'))
+    www, ftp = work / 'www', work / 'ftp'
+    www.mkdir(parents=True, exist_ok=True); ftp.mkdir(parents=True, exist_ok=True)
+    https, ftps = http_server(www), ftp_server(ftp)
+    results = {}
+    try:
+        for size in sizes:
+            pack = f'benchpkg{size}'
+            tree = make_sized(www, pack, size)
+            shutil.copytree(tree, ftp / pack, dirs_exist_ok=True)
+            urls = {
+                'file': 'file://' + tree.as_posix(),
+                'http': f'{https.url}/{pack}',
+                'ftp': f'{ftps.url}/{pack}',
+                'whl': f'{https.url}/' + make_wheel(tree, www / f'{pack}-1.0-py3-none-any.whl').name,
+                'sdist': f'{https.url}/' + make_sdist(tree, www / f'{pack}-1.0.tar.gz').name,
+            }
+            for kind in kinds:
+                runs = {'cold': [], 'warm': []}
+                for r in range(repeat):
+                    cache = work / f'cache-{kind}-{size}-{r}' # cold: empty disk cache, warm: same cache again
+                    for phase in ('cold', 'warm'):
+                        logs = len(https.logs), len(ftps.logs)
+                        res = spawn(urls[kind], cache)
+                        res['requests'] = (len(https.logs) - logs[0]) + (len(ftps.logs) - logs[1]) # http requests, ftp commands
+                        runs[phase].append(res)
+                results[f'{kind}-{size}'] = {phase: {k: statistics.median(r[k] for r in rs) if rs[0][k] is not None else None for k in rs[0]} for phase, rs in runs.items()}
+                cold, warm = results[f'{kind}-{size}']['cold'], results[f'{kind}-{size}']['warm']
+                print(f"[INF] {kind:>5}-{size:<5} cold {cold['seconds'] * 1e3:9.1f}ms {cold['requests']:6} req | warm {warm['seconds'] * 1e3:9.1f}ms {warm['requests']:6} req | rss {(cold['rss'] or 0) / 2**20:7.1f}MB", flush=True)
+    finally:
+        for server in (https, ftps): server.shutdown(); server.server_close()
+    return {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'sizes': list(sizes), 'kinds': list(kinds), 'repeat': repeat},
+        'results': results,
+        'overhead': overhead(work / 'over'),
+    }
+
+def compare(new: dict, old: dict) -> list : # [(key, metric, old, new, ratio)...] of slower than REGRESSION
+    slow = []
+    for key, phases in new['results'].items():
+        for phase, res in phases.items():
+            prev = old.get('results', {}).get(key, {}).get(phase, {})
+            for metric in ('seconds', 'requests', 'rss'):
+                if res.get(metric) and prev.get(metric):
+                    ratio = res[metric] / prev[metric]
+                    print(f"[CMP] {key:>12} {phase} {metric:>8} {prev[metric]:>14.4f} → {res[metric]:>14.4f} x{ratio:5.2f}")
+                    if REGRESSION < ratio: slow.append((f'{key}/{phase}', metric, prev[metric], res[metric], ratio))
+    for metric, value in new['overhead'].items():
+        prev = old.get('overhead', {}).get(metric)
+        if prev and REGRESSION < value / prev: slow.append(('overhead', metric, prev, value, value / prev))
+    return slow
+
+def main(argv=None) -> int :
+    pars = argparse.ArgumentParser(description='importpy benchmark, local http/ftp stand-ins')
+    pars.add_argument('--child', help=argparse.SUPPRESS)
+    pars.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    pars.add_argument('--kinds', nargs='+', default=list(KINDS), choices=KINDS)
+    pars.add_argument('--repeat', type=int, default=1)
+    pars.add_argument('--out', default='bench_output.json', help='results saved for regression comparison')
+    pars.add_argument('--compare', help='baseline results, exit 1 on regression')
+    args = pars.parse_args(argv)
+    if args.child: print(json.dumps(child(args.child))); return 0
+    result = run(args.sizes, args.kinds, repeat=args.repeat)
+    print(f"[INF] _imports overhead per call " + ', '.join(f"{k} {v:.2f}us" for k, v in result['overhead'].items()))
+    with open(args.out, 'w', encoding='utf-8') as f: json.dump(result, f, indent=1)
+    print(f"[INF] saved [{args.out}]")
+    if not args.compare: return 0
+    with open(args.compare, 'r', encoding='utf-8') as f: slow = compare(result, json.load(f))
+    for key, metric, old, new, ratio in slow: print(f"[ERR] regression {key} {metric} {old:.4f} → {new:.4f} x{ratio:.2f}")
+    return 1 if slow else 0
+
+if __name__ == "__main__":
+    sys.exit(main())